@@ -0,0 +1,127 @@
+"""로컬 복호화(kakao_decrypt)와 Iris API 복호화 속도 비교
+
+    # 실제 Iris 서버에서 최근 메시지 암호문을 기록
+    python bench_decrypt.py samples.json --record 300 --endpoint http://127.0.0.1:3000
+    # 기록된 암호문으로 두 백엔드 비교
+    python bench_decrypt.py samples.json --endpoint http://127.0.0.1:3000
+    # 서버 없이 합성 데이터로 로컬 백엔드만 측정
+    python bench_decrypt.py samples.json --synthetic 1000
+"""
+import argparse
+import json
+import random
+import time
+from typing import List, Dict, Any
+
+try:
+    from . import kakao_decrypt
+except ImportError:
+    import kakao_decrypt
+
+def _thread_helper():
+    # Iris 서버를 쓰는 모드에서만 필요하므로 합성 샘플 측정은 iris 패키지 없이도 동작
+    try: from . import thread_helper
+    except ImportError: import thread_helper
+    return thread_helper
+
+def _load(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["): return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def _save(path: str, samples: List[Dict[str, Any]]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(samples, f, ensure_ascii=False)
+
+def record_samples(endpoint: str, count: int) -> List[Dict[str, Any]]:
+    """Iris 서버의 chat_logs에서 암호화된 메시지를 수집"""
+    from iris.bot._internal.iris import IrisAPI
+    th = _thread_helper()
+    api = IrisAPI(endpoint)
+    rows = api.query("SELECT user_id, message, v FROM chat_logs WHERE message IS NOT NULL ORDER BY id DESC LIMIT ?", [count])
+    samples = []
+    for r in rows:
+        try: enc = int(json.loads(r.get("v") or "{}").get("enc", 0))
+        except Exception: enc = th._swallowed("bench_decrypt.v", 0)
+        text = r.get("message") or ""
+        if enc and text and not text.startswith("{"):
+            samples.append({"enc": enc, "user_id": int(r["user_id"]), "text": text})
+    return samples
+
+def synthetic_samples(count: int, users: int = 50, seed: int = 0) -> List[Dict[str, Any]]:
+    """로컬 암호화로 생성한 합성 암호문"""
+    rng = random.Random(seed)
+    samples = []
+    for i in range(count):
+        user_id = 10_000_000 + rng.randrange(users)
+        plain = "메시지 %d " % i + "가" * rng.randrange(1, 80)
+        samples.append({"enc": 31, "user_id": user_id, "text": kakao_decrypt.encrypt(31, plain, user_id), "plain": plain})
+    return samples
+
+def _bench_local(samples: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    items = [(s["enc"], s["text"], s["user_id"]) for s in samples]
+    kakao_decrypt.derive_key.cache_clear()
+    start = time.perf_counter()
+    results = kakao_decrypt.LocalDecryptor().decrypt_many(items)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        kakao_decrypt.LocalDecryptor().decrypt_many(items)
+    warm = (time.perf_counter() - start) / repeat
+    return {
+        "cold_total_ms": round(cold * 1000, 3),
+        "warm_total_ms": round(warm * 1000, 3),
+        "warm_per_item_us": round(warm / max(len(items), 1) * 1e6, 3),
+        "failed": sum(1 for r in results if r is None),
+        "results": results,
+    }
+
+def _bench_remote(samples: List[Dict[str, Any]], endpoint: str) -> Dict[str, Any]:
+    from iris.bot._internal.iris import IrisAPI
+    th = _thread_helper()
+    api = IrisAPI(endpoint)
+    results = []
+    start = time.perf_counter()
+    for s in samples:
+        try: results.append(api.decrypt(s["enc"], s["text"], s["user_id"]))
+        except Exception: results.append(th._swallowed("bench_decrypt.remote"))
+    elapsed = time.perf_counter() - start
+    return {
+        "total_ms": round(elapsed * 1000, 3),
+        "per_item_us": round(elapsed / max(len(samples), 1) * 1e6, 3),
+        "failed": sum(1 for r in results if r is None),
+        "results": results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 / Iris API 복호화 벤치마크")
+    parser.add_argument("samples", help="암호문 샘플 파일 (JSON 배열 또는 NDJSON: enc, user_id, text)")
+    parser.add_argument("--endpoint", help="비교할 Iris 서버 주소")
+    parser.add_argument("--record", type=int, metavar="N", help="Iris 서버에서 N개 메시지를 기록하여 samples에 저장")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="합성 샘플 N개를 생성하여 samples에 저장")
+    parser.add_argument("--repeat", type=int, default=5, help="로컬 warm 측정 반복 횟수")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        if not args.endpoint: parser.error("--record에는 --endpoint가 필요합니다")
+        _save(args.samples, record_samples(args.endpoint, args.record))
+    elif args.synthetic:
+        _save(args.samples, synthetic_samples(args.synthetic))
+    samples = _load(args.samples)
+
+    report = {"samples": len(samples), "local": _bench_local(samples, args.repeat)}
+    if args.endpoint:
+        report["remote"] = _bench_remote(samples, args.endpoint)
+        pairs = list(zip(report["local"]["results"], report["remote"]["results"]))
+        report["mismatch"] = sum(1 for a, b in pairs if a is not None and b is not None and a != b)
+        report["speedup"] = round(report["remote"]["total_ms"] / max(report["local"]["warm_total_ms"], 1e-6), 1)
+    elif samples and "plain" in samples[0]:
+        report["mismatch"] = sum(1 for s, r in zip(samples, report["local"]["results"]) if r != s["plain"])
+    for key in ("local", "remote"):
+        if key in report: report[key].pop("results")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
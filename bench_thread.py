@@ -0,0 +1,149 @@
+"""가짜 Iris API(fake_iris) 위에서 스레드 헬퍼의 확장성 측정
+
+    # 기본 방 구성으로 측정하여 결과 저장
+    python bench_thread.py results.json --threads 20 --replies 200 --query-latency 0.002
+    # 이전 결과와 비교 (wall time이 threshold배 이상 느려지거나 query/decrypt 수가 늘면 종료 코드 1)
+    python bench_thread.py new.json --compare results.json --threshold 1.2
+
+각 케이스는 캐시와 스레드 인덱스를 비운 cold 실행과 바로 이어지는 warm 실행을 측정하며,
+wall time, query/decrypt 호출 수, tracemalloc 최대 메모리(별도 cold 실행에서 측정)를 기록합니다.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Dict, Any, Callable
+
+try:
+    from . import thread_helper as th
+    from . import fake_iris
+except ImportError:
+    import thread_helper as th
+    import fake_iris
+
+def _cases(limit: int) -> Dict[str, Callable]:
+    """케이스 이름 -> fn(chat)  (chat은 측정마다 새로 만든 ChatContext)"""
+    return {
+        "get_thread_source": lambda c: th.get_thread_source(c),
+        "get_thread_messages": lambda c: th.get_thread_messages(c, th.get_thread_id(c), limit=limit),
+        "get_thread_as_dict": lambda c: th.get_thread_as_dict(c, limit=limit),
+        "get_thread_summary": lambda c: th.get_thread_summary(c),
+        "get_participant_list": lambda c: th.get_participant_list(c, limit=limit),
+        "get_thread_timeline": lambda c: th.get_thread_timeline(c, limit=limit),
+        "get_thread_context": lambda c: th.get_thread_context(c),
+        "filter_thread_by_user": lambda c: th.filter_thread_by_user(c, c.sender.id),
+        "estimate_reply_target": lambda c: th.estimate_reply_target(c),
+        "get_room_threads": lambda c: th.get_room_threads(c),
+        "Thread.raw": lambda c: c.thread.raw,
+        "Thread.participants": lambda c: c.thread.participants,
+        "Thread.stats": lambda c: c.thread.stats,
+        "Thread.summary": lambda c: c.thread.summary,
+        "Thread.timeline": lambda c: c.thread.timeline(limit),
+        "Thread.messages": lambda c: c.thread.messages(limit),
+        "Thread.get_context": lambda c: c.thread.get_context(),
+    }
+
+def _run(api: fake_iris.FakeIrisAPI, message_id: int, fn: Callable) -> Dict[str, Any]:
+    chat = fake_iris.make_chat(api, message_id)
+    api.reset_counters()
+    start = time.perf_counter()
+    fn(chat)
+    elapsed = time.perf_counter() - start
+    return {"wall_ms": round(elapsed * 1000, 3), **api.counters()}
+
+def _peak_kb(api: fake_iris.FakeIrisAPI, message_id: int, fn: Callable) -> float:
+    th.clear_caches()
+    chat = fake_iris.make_chat(api, message_id)
+    tracemalloc.start()
+    try:
+        fn(chat)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+def run_benchmark(threads: int = 10, replies: int = 100, users: int = 20, interleave: bool = True, noise: float = 1.0,
+                  encrypted_ratio: float = 0.5, query_latency: float = 0.0, decrypt_latency: float = 0.0,
+                  limit: int = 100, repeat: int = 3, only=None, seed: int = 0) -> Dict[str, Any]:
+    config = dict(locals())
+    config.pop("only")
+    api = fake_iris.FakeIrisAPI(query_latency=query_latency, decrypt_latency=decrypt_latency)
+    sources = fake_iris.generate_room(api, threads=threads, replies=replies, users=users, interleave=interleave,
+                                      noise=noise, encrypted_ratio=encrypted_ratio, seed=seed)
+    # 봇이 받은 이벤트처럼 첫 번째 스레드의 마지막 답장을 기준 메시지로 사용
+    message_id = api.last_reply(sources[0])
+
+    results = {}
+    for name, fn in _cases(limit).items():
+        if only and name not in only: continue
+        cold, warm = [], []
+        for _ in range(repeat):
+            th.clear_caches()
+            cold.append(_run(api, message_id, fn))
+            warm.append(_run(api, message_id, fn))
+        results[name] = {
+            "cold": min(cold, key=lambda r: r["wall_ms"]),
+            "warm": min(warm, key=lambda r: r["wall_ms"]),
+            "peak_kb": _peak_kb(api, message_id, fn),
+        }
+    th.clear_caches()
+    return {
+        "config": config,
+        "python": platform.python_version(),
+        "pipeline": th._PIPELINE_ENABLED,
+        "results": results,
+    }
+
+def compare(new: Dict[str, Any], old: Dict[str, Any], threshold: float = 1.2) -> list:
+    """old 대비 회귀 항목 목록 (wall time threshold배 초과, query/decrypt 증가)"""
+    regressions = []
+    for name, cur in new["results"].items():
+        prev = old.get("results", {}).get(name)
+        if not prev: continue
+        for phase in ("cold", "warm"):
+            a, b = prev[phase], cur[phase]
+            if b["wall_ms"] > a["wall_ms"] * threshold and b["wall_ms"] - a["wall_ms"] > 1:
+                regressions.append(f"{name}.{phase}.wall_ms: {a['wall_ms']} -> {b['wall_ms']}")
+            for key in ("queries", "decrypts"):
+                if b[key] > a[key]: regressions.append(f"{name}.{phase}.{key}: {a[key]} -> {b[key]}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="스레드 헬퍼 벤치마크 (가짜 Iris API 사용)")
+    parser.add_argument("output", help="결과 JSON 저장 경로")
+    parser.add_argument("--threads", type=int, default=10, help="방의 스레드 수")
+    parser.add_argument("--replies", type=int, default=100, help="스레드당 답장 수")
+    parser.add_argument("--users", type=int, default=20, help="방 참여자 수")
+    parser.add_argument("--no-interleave", action="store_true", help="스레드 답장을 섞지 않고 스레드별로 몰아서 생성")
+    parser.add_argument("--noise", type=float, default=1.0, help="답장 1개당 일반 메시지 비율")
+    parser.add_argument("--encrypted-ratio", type=float, default=0.5, help="암호화된 supplement 비율")
+    parser.add_argument("--query-latency", type=float, default=0.0, help="query 호출당 주입할 지연 (초)")
+    parser.add_argument("--decrypt-latency", type=float, default=0.0, help="decrypt 호출당 주입할 지연 (초)")
+    parser.add_argument("--limit", type=int, default=100, help="헬퍼에 넘길 limit")
+    parser.add_argument("--repeat", type=int, default=3, help="케이스별 반복 횟수 (최솟값 기록)")
+    parser.add_argument("--only", nargs="*", help="측정할 케이스 이름")
+    parser.add_argument("--pipeline", action="store_true", help="파이프라인 모드로 측정")
+    parser.add_argument("--compare", metavar="BASELINE", help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=1.2, help="wall time 회귀 판정 배율")
+    args = parser.parse_args(argv)
+
+    if args.pipeline: th.configure_pipeline(enabled=True)
+    report = run_benchmark(threads=args.threads, replies=args.replies, users=args.users, interleave=not args.no_interleave,
+                           noise=args.noise, encrypted_ratio=args.encrypted_ratio, query_latency=args.query_latency,
+                           decrypt_latency=args.decrypt_latency, limit=args.limit, repeat=args.repeat, only=args.only)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for name, r in report["results"].items():
+        print(f"{name:24} cold {r['cold']['wall_ms']:>9.2f}ms q={r['cold']['queries']:<4} d={r['cold']['decrypts']:<5}"
+              f" warm {r['warm']['wall_ms']:>8.2f}ms q={r['warm']['queries']:<3} peak {r['peak_kb']}KB")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions: print("회귀:", line)
+        if regressions: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""SQLite 기반 가짜 Iris API (벤치마크·로컬 실험용)
+
+실제 서버 없이 chat_logs / chat_rooms / db2.open_chat_member / db2.friends 테이블을 메모리에 만들고,
+IrisAPI와 같은 query / decrypt 인터페이스를 제공합니다. 복호화는 결정적인 가짜 암호(fake_encrypt)를
+되돌리는 방식이며, 호출마다 지연 시간을 주입할 수 있습니다.
+
+    from helper.fake_iris import FakeIrisAPI, generate_room, make_chat
+    api = FakeIrisAPI(query_latency=0.002)
+    sources = generate_room(api, threads=10, replies=50)
+    chat = make_chat(api, api.last_reply(sources[0]))
+
+serve(api)을 호출하면 같은 데이터를 Iris HTTP 엔드포인트(/query, /decrypt, /reply)로도 제공하므로
+thread_async의 AsyncIrisTransport나 send_to_thread 같은 HTTP 경로도 같은 가짜 서버로 실행할 수 있습니다.
+"""
+import base64
+import json
+import random
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, List, Dict, Any
+
+from iris import ChatContext
+from iris.bot.models import Message, Room, User
+
+_FAKE_PREFIX = "FAKE"
+
+def fake_encrypt(text: str, user_id: int) -> str:
+    """user_id에 묶인 결정적 가짜 암호문 (공백·한글이 없어 암호화된 닉네임으로 인식됨)"""
+    data = f"{int(user_id)}:{text}".encode("utf-8")
+    return _FAKE_PREFIX + base64.b64encode(data).decode("ascii")
+
+def fake_decrypt(text: str, user_id: int) -> str:
+    if not text.startswith(_FAKE_PREFIX): raise ValueError("가짜 암호문이 아닙니다")
+    owner, _, plain = base64.b64decode(text[len(_FAKE_PREFIX):]).decode("utf-8").partition(":")
+    if int(owner) != int(user_id): raise ValueError("user_id가 일치하지 않습니다")
+    return plain
+
+class FakeIrisAPI:
+    """IrisAPI 대용 (query / decrypt 호출 수와 지연 시간 제어)"""
+    iris_endpoint = "http://fake-iris"
+
+    def __init__(self, query_latency: float = 0.0, decrypt_latency: float = 0.0, path: str = ":memory:"):
+        self.query_latency = query_latency
+        self.decrypt_latency = decrypt_latency
+        self.queries = 0
+        self.decrypts = 0
+        self._threads = {}
+        self.sent = []
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("ATTACH ':memory:' AS db2")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS chat_logs (id INTEGER PRIMARY KEY, chat_id INTEGER, user_id INTEGER, type INTEGER,
+                message TEXT, attachment TEXT, v TEXT, created_at INTEGER, supplement TEXT);
+            CREATE INDEX IF NOT EXISTS chat_logs_chat_id ON chat_logs (chat_id, id);
+            CREATE TABLE IF NOT EXISTS chat_rooms (id INTEGER PRIMARY KEY, link_id INTEGER, members TEXT);
+            CREATE TABLE db2.open_chat_member (user_id INTEGER, link_id INTEGER, nickname TEXT, enc INTEGER);
+            CREATE TABLE db2.friends (id INTEGER PRIMARY KEY, name TEXT, enc INTEGER);
+        """)
+
+    def query(self, query: str, bind: Optional[List[Any]] = None) -> List[dict]:
+        if self.query_latency: time.sleep(self.query_latency)
+        with self._lock:
+            self.queries += 1
+            return [dict(r) for r in self.db.execute(query, bind or [])]
+
+    def decrypt(self, enc: int, b64_ciphertext: str, user_id: int) -> str:
+        if self.decrypt_latency: time.sleep(self.decrypt_latency)
+        with self._lock: self.decrypts += 1
+        if not enc: raise Exception("Iris 오류: enc가 없습니다")
+        try: return fake_decrypt(b64_ciphertext, user_id)
+        except ValueError as e: raise Exception(f"Iris 오류: {e}")
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock: return {"queries": self.queries, "decrypts": self.decrypts}
+
+    def reset_counters(self):
+        with self._lock: self.queries = self.decrypts = 0
+
+    def last_reply(self, thread_id: int) -> int:
+        """스레드의 마지막 답장 ID (generate_room이 기록한 정보 기준)"""
+        return self._threads[int(thread_id)][-1]
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        api = self.server.api
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if self.path == "/query": body = {"data": api.query(payload.get("query", ""), payload.get("bind"))}
+            elif self.path == "/decrypt": body = {"plain_text": api.decrypt(payload.get("enc"), payload.get("b64_ciphertext", ""), payload.get("user_id"))}
+            elif self.path == "/reply":
+                with api._lock: api.sent.append(payload)
+                body = {"success": True}
+            else: return self._respond(404, {"message": f"알 수 없는 경로: {self.path}"})
+        except Exception as e:
+            return self._respond(400, {"message": str(e).replace("Iris 오류: ", "")})
+        self._respond(200, body)
+
+    def _respond(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def serve(api: FakeIrisAPI, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """api를 백그라운드 HTTP 서버로 띄우고 api.iris_endpoint를 그 주소로 바꿈 (종료는 server.shutdown())"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.api = api
+    api.iris_endpoint = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def generate_room(api: FakeIrisAPI, room_id: int = 1, threads: int = 10, replies: int = 50, users: int = 20,
+                  interleave: bool = True, noise: float = 0.5, encrypted_ratio: float = 0.5,
+                  friends_ratio: float = 0.1, seed: int = 0) -> List[int]:
+    """스레드가 있는 방을 생성하고 원본 메시지 ID 목록을 반환
+
+    - interleave: True면 여러 스레드의 답장이 시간순으로 섞이고, False면 스레드별로 몰려 있음
+    - noise: 스레드 답장 1개당 섞이는 일반 메시지 비율
+    - encrypted_ratio: supplement가 암호화되어 저장된 답장의 비율
+    - friends_ratio: open_chat_member 대신 friends에만 있는 유저의 비율
+    """
+    rng = random.Random(seed)
+    db = api.db
+    link_id = 10_000 + room_id
+    base_user = room_id * 1_000_000
+    user_ids = [base_user + i for i in range(users)]
+    for i, uid in enumerate(user_ids):
+        nickname = f"유저{i}"
+        if rng.random() < friends_ratio:
+            db.execute("INSERT OR REPLACE INTO db2.friends VALUES (?, ?, 31)", (uid, fake_encrypt(nickname, uid)))
+        else:
+            db.execute("INSERT INTO db2.open_chat_member VALUES (?, ?, ?, 31)", (uid, link_id, fake_encrypt(nickname, uid)))
+    db.execute("INSERT OR REPLACE INTO chat_rooms VALUES (?, ?, ?)", (room_id, link_id, json.dumps(user_ids)))
+
+    row = db.execute("SELECT MAX(id) FROM chat_logs").fetchone()
+    next_id = [(row[0] or 0) + 1]
+    rows = []
+
+    def _insert(uid: int, text: str, supplement: Optional[str]) -> int:
+        mid = next_id[0]
+        next_id[0] += 1
+        rows.append((mid, room_id, uid, 1, fake_encrypt(text, uid), "", json.dumps({"enc": 31}), 1_700_000_000 + mid, supplement))
+        return mid
+
+    sources = [_insert(rng.choice(user_ids), f"원본 {t}", None) for t in range(threads)]
+    order = [t for t in range(threads) for _ in range(replies)]
+    if interleave: rng.shuffle(order)
+    counts = [0] * threads
+    thread_replies = {s: [] for s in sources}
+    for t in order:
+        while rng.random() < noise / (1 + noise):
+            _insert(rng.choice(user_ids), "일반 메시지", None)
+        uid = rng.choice(user_ids)
+        mention = rng.randrange(users)
+        supplement = json.dumps({"threadId": sources[t]})
+        if rng.random() < encrypted_ratio: supplement = fake_encrypt(supplement, uid)
+        thread_replies[sources[t]].append(_insert(uid, f"답장 {t}-{counts[t]} @유저{mention}", supplement))
+        counts[t] += 1
+
+    db.executemany("INSERT INTO chat_logs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    db.commit()
+    api._threads.update(thread_replies)
+    return sources
+
+def make_chat(api: FakeIrisAPI, message_id: int) -> ChatContext:
+    """chat_logs 레코드로 봇 이벤트와 같은 모양의 ChatContext 생성"""
+    with api._lock:
+        record = dict(api.db.execute("SELECT * FROM chat_logs WHERE id = ?", [message_id]).fetchone())
+    uid = int(record["user_id"])
+    row = api.db.execute("SELECT nickname FROM db2.open_chat_member WHERE user_id = ? UNION ALL SELECT name FROM db2.friends WHERE id = ?", [uid, uid]).fetchone()
+    name = fake_decrypt(row[0], uid) if row else str(uid)
+    room = Room(id=int(record["chat_id"]), name="bench", api=api)
+    sender = User(id=uid, chat_id=int(record["chat_id"]), api=api, name=name, bot_id=0)
+    message = Message(id=int(record["id"]), type=int(record["type"]), msg=fake_decrypt(record["message"], uid), attachment="", v={})
+    return ChatContext(room=room, sender=sender, message=message, raw=record, api=api, _bot_id=0)
@@ -0,0 +1,153 @@
+"""카카오톡 enc 암호화 방식의 로컬 복호화 엔진
+
+Iris 서버의 /decrypt 왕복 없이 프로세스 안에서 메시지·닉네임·supplement를 복호화합니다.
+AES 구현으로 pycryptodome 또는 cryptography 중 설치된 것을 사용합니다.
+
+    from helper.kakao_decrypt import LocalDecryptor
+    from helper import thread_helper
+    thread_helper.set_decrypt_backend(LocalDecryptor())
+"""
+import base64
+import hashlib
+from functools import lru_cache
+from typing import Optional, List, Tuple, Iterable
+
+try:
+    from Crypto.Cipher import AES as _AES
+except ImportError:
+    _AES = None
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher as _Cipher, algorithms as _algorithms, modes as _modes
+except ImportError:
+    _Cipher = None
+
+_KEY_BYTES = b'\x16\x08\x09\x6f\x02\x17\x2b\x08\x21\x21\x0a\x10\x03\x03\x07\x06'
+_IV_BYTES = b'\x0f\x08\x01\x00\x19\x47\x25\xdc\x15\xf5\x17\xe0\xe1\x15\x0c\x35'
+
+_INCEPT_DICT1 = [
+    'adrp.ldrsh.ldnp', 'ldpsw', 'umax', 'stnp.rsubhn', 'sqdmlsl', 'uqrshl.csel', 'sqshlu', 'umin.usubl.umlsl', 'cbnz.adds', 'tbnz',
+    'usubl2', 'stxr', 'sbfx', 'strh', 'stxrb.adcs', 'stxrh', 'ands.urhadd', 'subs', 'sbcs', 'fnmadd.ldxrb.saddl',
+    'stur', 'ldrsb', 'strb', 'prfm', 'ubfiz', 'ldrsw.madd.msub.sturb.ldursb', 'ldrb', 'b.eq', 'ldur.sbfiz', 'extr',
+    'fmadd', 'uqadd', 'sshr.uzp1.sttrb', 'umlsl2', 'rsubhn2.ldrh.uqsub', 'uqshl', 'uabd', 'ursra', 'usubw', 'uaddl2',
+    'b.gt', 'b.lt', 'sqshl', 'bics', 'smin.ubfx', 'smlsl2', 'uabdl2', 'zip2.ssubw2', 'ccmp', 'sqdmlal',
+    'b.al', 'smax.ldurh.uhsub', 'fcvtxn2', 'b.pl',
+]
+_INCEPT_DICT2 = [
+    'saddl', 'urhadd', 'ubfiz.sqdmlsl.tbnz.stnp', 'smin', 'strh', 'ccmp', 'usubl', 'umlsl', 'uzp1', 'sbfx',
+    'b.eq', 'zip2.prfm.strb', 'msub', 'b.pl', 'csel', 'stxrh.ldxrb', 'uqrshl.ldrh', 'cbnz', 'ursra', 'sshr.ubfx.ldur.ldnp',
+    'fcvtxn2', 'usubl2', 'uaddl2', 'b.al', 'ssubw2', 'umax', 'b.lt', 'adrp.sturb', 'extr', 'uqshl',
+    'smax', 'uqsub.sqshlu', 'ands', 'madd', 'umin', 'b.gt', 'uabdl2', 'ldrsb.ldpsw.rsubhn', 'uqadd', 'sttrb',
+    'stxr', 'adds', 'rsubhn2.umlsl2', 'sbcs.fmadd', 'usubw', 'sqshl', 'stur.ldrsh.smlsl2', 'ldrsw', 'fnmadd', 'stxrb.sbfiz',
+    'adcs', 'bics.ldrb', 'l1ursb', 'subs.uhsub', 'ldurh', 'uabd', 'sqdmlal',
+]
+
+def _incept(n: int) -> str:
+    return _INCEPT_DICT1[n % len(_INCEPT_DICT1)] + '.' + _INCEPT_DICT2[(n + 31) % len(_INCEPT_DICT2)]
+
+_SALT_PREFIXES = [
+    '', '', '12', '24', '18', '30', '36', '12', '48', '7', '35', '40', '17', '23', '29',
+    'isabel', 'kale', 'sulli', 'van', 'merry', 'kyle', 'james', 'maddux',
+    'tony', 'hayden', 'paul', 'elijah', 'dorothy', 'sally', 'bran',
+    _incept(830819), 'veil',
+]
+
+def is_available() -> bool:
+    """AES 구현(pycryptodome / cryptography) 설치 여부"""
+    return _AES is not None or _Cipher is not None
+
+def _gen_salt(user_id: int, enc: int) -> bytes:
+    if user_id <= 0: return b'\0' * 16
+    if not 0 <= enc < len(_SALT_PREFIXES):
+        raise ValueError(f"지원하지 않는 enc 타입: {enc}")
+    salt = (_SALT_PREFIXES[enc] + str(user_id))[:16]
+    return (salt + '\0' * (16 - len(salt))).encode('utf-8')
+
+def _pkcs16_adjust(a: list, offset: int, b: list):
+    x = (b[-1] & 0xff) + (a[offset + len(b) - 1] & 0xff) + 1
+    a[offset + len(b) - 1] = x % 256
+    x >>= 8
+    for i in range(len(b) - 2, -1, -1):
+        x += (b[i] & 0xff) + (a[offset + i] & 0xff)
+        a[offset + i] = x % 256
+        x >>= 8
+
+def _derive_key(password: bytes, salt: bytes, iterations: int = 2, size: int = 32) -> bytes:
+    """PKCS#12 방식(SHA-1) 키 유도"""
+    password = (password + b'\0').decode('ascii').encode('utf-16-be')
+    v, u = 64, 20
+    D = [1] * v
+    S = [salt[i % len(salt)] for i in range(v * ((len(salt) + v - 1) // v))]
+    P = [password[i % len(password)] for i in range(v * ((len(password) + v - 1) // v))]
+    I = S + P
+    key = []
+    for _ in range((size + u - 1) // u):
+        A = hashlib.sha1(bytes(D) + bytes(I)).digest()
+        for _ in range(1, iterations):
+            A = hashlib.sha1(A).digest()
+        B = [A[j % len(A)] for j in range(v)]
+        for j in range(len(I) // v):
+            _pkcs16_adjust(I, j * v, B)
+        key.extend(A)
+    return bytes(key[:size])
+
+@lru_cache(maxsize=4096)
+def derive_key(enc: int, user_id: int) -> bytes:
+    """(enc, user_id) 조합의 AES 키 (캐시됨)"""
+    return _derive_key(_KEY_BYTES, _gen_salt(int(user_id), int(enc)))
+
+def _aes_cbc(key: bytes, data: bytes, encrypt: bool) -> bytes:
+    if _AES is not None:
+        cipher = _AES.new(key, _AES.MODE_CBC, _IV_BYTES)
+        return cipher.encrypt(data) if encrypt else cipher.decrypt(data)
+    if _Cipher is not None:
+        cipher = _Cipher(_algorithms.AES(key), _modes.CBC(_IV_BYTES))
+        ctx = cipher.encryptor() if encrypt else cipher.decryptor()
+        return ctx.update(data) + ctx.finalize()
+    raise RuntimeError("AES 구현이 없습니다 (pycryptodome 또는 cryptography 설치 필요)")
+
+def decrypt(enc: int, b64_ciphertext: str, user_id: int) -> str:
+    """단일 문자열 복호화 (패딩/UTF-8 검증 실패 시 ValueError)"""
+    data = base64.b64decode(b64_ciphertext)
+    if not data: return ''
+    if len(data) % 16: raise ValueError("블록 크기가 맞지 않습니다")
+    padded = _aes_cbc(derive_key(enc, user_id), data, encrypt=False)
+    pad = padded[-1]
+    if not 1 <= pad <= 16 or padded[-pad:] != bytes([pad]) * pad:
+        raise ValueError("잘못된 패딩")
+    return padded[:-pad].decode('utf-8')
+
+def encrypt(enc: int, plain_text: str, user_id: int) -> str:
+    """단일 문자열 암호화 (테스트 데이터·벤치마크용)"""
+    data = plain_text.encode('utf-8')
+    pad = 16 - len(data) % 16
+    return base64.b64encode(_aes_cbc(derive_key(enc, user_id), data + bytes([pad]) * pad, encrypt=True)).decode('ascii')
+
+class LocalDecryptor:
+    """thread_helper.set_decrypt_backend()에 연결하는 로컬 복호화 백엔드
+
+    검증에 연속으로 실패하기만 한 enc 타입은 max_failures회 이후 건너뛰어
+    원격 복호화로 바로 넘어가게 합니다.
+    """
+    def __init__(self, max_failures: int = 20):
+        if not is_available():
+            raise RuntimeError("AES 구현이 없습니다 (pycryptodome 또는 cryptography 설치 필요)")
+        self.max_failures = max_failures
+        self._failures = {}
+        self._supported = set()
+
+    def decrypt(self, enc: int, text: str, user_id: int) -> Optional[str]:
+        enc = int(enc)
+        if enc not in self._supported and self._failures.get(enc, 0) >= self.max_failures: return None
+        try:
+            plain = decrypt(enc, text, int(user_id))
+        except (ValueError, TypeError, UnicodeDecodeError):
+            if enc not in self._supported:
+                self._failures[enc] = self._failures.get(enc, 0) + 1
+            return None
+        self._supported.add(enc)
+        return plain
+
+    def decrypt_many(self, items: Iterable[Tuple[int, str, int]]) -> List[Optional[str]]:
+        """(enc, text, user_id) 묶음을 한 번에 복호화 (실패 항목은 None)"""
+        return [self.decrypt(enc, text, user_id) for enc, text, user_id in items]
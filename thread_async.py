@@ -0,0 +1,498 @@
+"""thread_helper의 asyncio 버전
+
+IrisAPI 대신 aiohttp 기반 AsyncIrisTransport로 query / decrypt / reply를 호출하므로
+하나의 이벤트 루프에서 여러 방의 스레드 조회를 동시에 기다릴 수 있습니다.
+캐시(유저 정보, 복호화, 원본 메시지)와 스레드 인덱스는 동기 버전과 공유하며 결과 형식도 같습니다.
+
+    from helper.thread_async import AsyncThread
+
+    thread = AsyncThread(chat)
+    print(await thread.summary())
+    await thread.send("확인했습니다")
+"""
+import asyncio
+import bisect
+import json
+import time
+import weakref
+from typing import Optional, List, Dict, Any, Union, Set
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from iris import ChatContext
+
+try:
+    from . import thread_helper as th
+except ImportError:
+    import thread_helper as th
+
+class AsyncIrisTransport:
+    """Iris HTTP API 비동기 클라이언트 (세션·커넥션 재사용)"""
+    def __init__(self, endpoint: str, timeout: float = 10, max_connections: int = 32, max_inflight: Optional[int] = None):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp가 설치되어 있지 않습니다 (pip install aiohttp)")
+        self.endpoint = endpoint.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._session = None
+        self._inflight = asyncio.Semaphore(max_inflight) if max_inflight else None
+        self._flights = {}
+
+    async def _session_get(self) -> "aiohttp.ClientSession":
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        session = await self._session_get()
+        if self._inflight is None:
+            return await self._request(session, path, payload)
+        async with self._inflight:
+            return await self._request(session, path, payload)
+
+    async def _request(self, session, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if not th._METRICS_ENABLED: return await self._send(session, path, payload)
+        start, ok = time.perf_counter(), False
+        try:
+            data = await self._send(session, path, payload)
+            ok = True
+            return data
+        finally:
+            th._METRICS.observe(path.strip("/"), time.perf_counter() - start, ok)
+
+    async def _send(self, session, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with session.post(f"{self.endpoint}{path}", json=payload) as res:
+            try: data = await res.json(content_type=None)
+            except Exception: data = th._swallowed("AsyncIrisTransport.json", {})
+            if not 200 <= res.status <= 299:
+                raise Exception(f"Iris 오류: {(data or {}).get('message', '알 수 없는 오류')}")
+            return data or {}
+
+    async def query(self, query: str, bind: Optional[List[Any]] = None) -> List[dict]:
+        for counter in th._FETCH_COUNTERS.get():
+            counter[0] += 1
+        data = await self._post("/query", {"query": query, "bind": bind or []})
+        return data.get("data", [])
+
+    async def decrypt(self, enc: int, b64_ciphertext: str, user_id: int) -> Optional[str]:
+        data = await self._post("/decrypt", {"enc": enc, "b64_ciphertext": b64_ciphertext, "user_id": user_id})
+        return data.get("plain_text")
+
+    async def reply(self, payload: Dict[str, Any]) -> bool:
+        try:
+            await self._post("/reply", payload)
+            return True
+        except Exception: return th._swallowed("AsyncIrisTransport.reply", False)
+
+    async def single_flight(self, key, factory):
+        """같은 키의 동시 요청을 하나의 코루틴 결과로 공유"""
+        future = self._flights.get(key)
+        if future is not None: return await asyncio.shield(future)
+        future = asyncio.ensure_future(factory())
+        self._flights[key] = future
+        try: return await asyncio.shield(future)
+        finally:
+            if future.done(): self._flights.pop(key, None)
+            else: future.add_done_callback(lambda _: self._flights.pop(key, None))
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+_TRANSPORTS = weakref.WeakKeyDictionary()
+
+def get_transport(endpoint: str) -> AsyncIrisTransport:
+    """현재 이벤트 루프에서 endpoint별로 공유되는 전송 객체 (루프가 사라지면 함께 정리)"""
+    loop = asyncio.get_running_loop()
+    transports = _TRANSPORTS.get(loop)
+    if transports is None:
+        transports = _TRANSPORTS[loop] = {}
+    transport = transports.get(endpoint)
+    if transport is None:
+        transport = transports[endpoint] = AsyncIrisTransport(endpoint)
+    return transport
+
+async def aclose():
+    """현재 이벤트 루프의 공유 전송 객체를 모두 닫음 (루프를 끝내기 전에 호출)"""
+    transports = _TRANSPORTS.pop(asyncio.get_running_loop(), {})
+    for transport in transports.values():
+        await transport.close()
+
+def _transport_for(chat: ChatContext, transport: Optional[AsyncIrisTransport]) -> AsyncIrisTransport:
+    return transport or get_transport(chat.api.iris_endpoint)
+
+async def _cache_get_many(cache: th.LRUCache, keys) -> Dict[Any, Any]:
+    """공유 캐시 일괄 조회 (L2 저장소가 연결돼 있으면 L1 미스만 executor에서 한 번에 조회해 이벤트 루프를 막지 않음)"""
+    if cache.store is None: return {key: cache.get(key) for key in keys}
+    found = {key: cache.peek(key) for key in keys}
+    missing = [key for key, value in found.items() if value is None]
+    if missing:
+        loaded = await asyncio.get_running_loop().run_in_executor(None, lambda: [cache.get(key) for key in missing])
+        found.update(zip(missing, loaded))
+    return found
+
+async def _cache_set_many(cache: th.LRUCache, items: Dict[Any, Any]):
+    """공유 캐시 일괄 저장 (L2 저장소 쓰기는 executor에서)"""
+    if not items: return
+    if cache.store is None:
+        for key, value in items.items(): cache.set(key, value)
+        return
+    await asyncio.get_running_loop().run_in_executor(None, lambda: [cache.set(key, value) for key, value in items.items()])
+
+async def _adecrypt_cached(transport: AsyncIrisTransport, enc: int, text: str, user_id: int) -> Optional[str]:
+    if not text or not enc: return None
+    key = (enc, text, user_id)
+    cached = (await _cache_get_many(th._DECRYPT_CACHE, [key]))[key]
+    if cached is not None: return cached
+    if th._DECRYPT_MISS_CACHE.get(key): return None
+    return await transport.single_flight(("decrypt",) + key, lambda: _adecrypt_and_store(transport, key))
+
+async def _adecrypt_and_store(transport: AsyncIrisTransport, key: tuple) -> Optional[str]:
+    enc, text, user_id = key
+    decrypted = None
+    backend = th._DECRYPT_BACKEND
+    if backend is not None:
+        try: decrypted = backend.decrypt(enc, text, user_id)
+        except Exception: decrypted = th._swallowed("adecrypt.backend")
+    if not decrypted:
+        try: decrypted = await transport.decrypt(enc, text, user_id)
+        except Exception: decrypted = th._swallowed("adecrypt")
+    if decrypted: await _cache_set_many(th._DECRYPT_CACHE, {key: decrypted})
+    else: th._DECRYPT_MISS_CACHE.set(key, True)
+    return decrypted
+
+async def _adecrypt_many(transport: AsyncIrisTransport, items: List[tuple]) -> List[Optional[str]]:
+    return list(await asyncio.gather(*(_adecrypt_cached(transport, *item) for item in items)))
+
+async def _afetch_users_batch(transport: AsyncIrisTransport, user_ids: Set[int]) -> Dict[int, Dict[str, Any]]:
+    result_map, missing_ids = {}, []
+    for uid, cached in (await _cache_get_many(th._USER_INFO_CACHE, user_ids)).items():
+        if cached: result_map[uid] = cached
+        elif not th._USER_MISS_CACHE.get(uid): missing_ids.append(uid)
+
+    for chunk in th._chunks(missing_ids):
+        placeholders = ', '.join(['?'] * len(chunk))
+        try:
+            member_rows, friend_rows = await asyncio.gather(
+                transport.query(f"SELECT user_id, nickname, enc FROM db2.open_chat_member WHERE user_id IN ({placeholders})", chunk),
+                transport.query(f"SELECT id, name, enc FROM db2.friends WHERE id IN ({placeholders})", chunk),
+            )
+        except Exception:
+            th._swallowed("afetch_users_batch")
+            continue
+        members = th._user_rows(member_rows, "user_id", "nickname")
+        friends = th._user_rows(friend_rows, "id", "name")
+        found = {}
+        for uid in chunk:
+            data = members.get(uid) or friends.get(uid)
+            if uid not in members: th._USER_MISS_CACHE.set(("member", uid), True)
+            if data: found[uid] = data
+            else: th._USER_MISS_CACHE.set(uid, True)
+        await _cache_set_many(th._USER_INFO_CACHE, found)
+        result_map.update(found)
+    return result_map
+
+async def _adecode_supplements(transport: AsyncIrisTransport, records: List[dict]) -> List[Optional[dict]]:
+    decoded = [None] * len(records)
+    encrypted = []
+    for i, record in enumerate(records):
+        supplement = record.get("supplement") or ""
+        if not supplement: continue
+        if supplement.startswith("{"):
+            try: decoded[i] = json.loads(supplement)
+            except Exception: th._swallowed("adecode_supplements.json")
+        else:
+            encrypted.append(i)
+    if not encrypted: return decoded
+
+    users = await _afetch_users_batch(transport, {int(records[i].get("user_id") or 0) for i in encrypted} - {0})
+    targets, items = [], []
+    for i in encrypted:
+        uid = int(records[i].get("user_id") or 0)
+        enc = (users.get(uid) or {}).get("enc")
+        if enc:
+            targets.append(i)
+            items.append((int(enc), records[i]["supplement"], uid))
+    for i, plain_text in zip(targets, await _adecrypt_many(transport, items)):
+        if plain_text:
+            try: decoded[i] = json.loads(plain_text)
+            except Exception: th._swallowed("adecode_supplements.decrypted_json")
+    return decoded
+
+async def _aprepare_records(transport: AsyncIrisTransport, records: List[dict]):
+    """발신자 조회 후 메시지·닉네임을 동시에 복호화하여 (유저 정보, 복호화 결과) 반환"""
+    user_cache = await _afetch_users_batch(transport, {int(r.get("user_id") or 0) for r in records} - {0})
+    items = []
+    for record in records:
+        user_id = int(record.get("user_id") or 0)
+        info = user_cache.get(user_id) or {}
+        enc, raw_name = info.get("enc"), info.get("name")
+        if not enc: continue
+        if raw_name and th._is_encrypted_name(raw_name):
+            items.append((int(enc), raw_name, user_id))
+        message_text = record.get("message", "")
+        if message_text and not message_text.startswith("{"):
+            items.append((int(enc), message_text, user_id))
+    items = list(dict.fromkeys(items))
+    plain = dict(zip(items, await _adecrypt_many(transport, items))) if items else {}
+    return user_cache, plain
+
+async def _abuild(chat: ChatContext, transport: AsyncIrisTransport, records: List[dict]) -> List[ChatContext]:
+    # 미리 받은 유저 정보와 복호화 결과만 사용하므로 조회 실패·캐시 제거가 있어도 이벤트 루프를 막는 동기 I/O가 없음
+    user_cache, plain = await _aprepare_records(transport, records)
+    built = (th._make_chat_from_record(chat, record, user_cache, plain) for record in records)
+    return [c for c in built if c]
+
+async def _aquery_records(transport: AsyncIrisTransport, where: str, bind: List[Any]) -> List[dict]:
+    """thread_helper._query_records의 비동기 버전 (조인 모드면 발신자 정보를 유저 캐시에 반영)"""
+    if not th._joined_enabled(): return await transport.query(th._records_sql(where, False), bind)
+    try:
+        records = await transport.query(th._records_sql(where, True), bind)
+        th._joined_succeeded()
+        users = th._seed_senders(records)
+        # 루프에서는 L1에만 반영되므로 L2 저장소 쓰기는 executor에서
+        if th._USER_INFO_CACHE.store is not None: await _cache_set_many(th._USER_INFO_CACHE, users)
+        return records
+    except Exception as e:
+        error = e
+        th._swallowed("query_records.joined")
+    records = await transport.query(th._records_sql(where, False), bind)
+    th._joined_failed(error)
+    return records
+
+async def _afetch_records(transport: AsyncIrisTransport, message_ids: List[int]) -> List[dict]:
+    records = []
+    for chunk in th._chunks(list(message_ids)):
+        placeholders = ', '.join(['?'] * len(chunk))
+        records.extend(await _aquery_records(transport, f"id IN ({placeholders})", chunk))
+    records.sort(key=lambda r: int(r["id"]))
+    return records
+
+async def _aquery_planned(transport: AsyncIrisTransport, build) -> List[dict]:
+    """thread_helper._query_planned의 비동기 버전 (JSON 함수 오류 시 기존 쿼리로 재시도)"""
+    planned = th._PLANNER_ENABLED
+    try: return await transport.query(*build(planned))
+    except Exception as e:
+        if not planned or not th._is_json_error(e): raise
+        th._planner_fallback()
+    return await transport.query(*build(False))
+
+async def _athread_replies(chat: ChatContext, transport: AsyncIrisTransport, thread_id: int):
+    """스레드 인덱스를 (필요하면 비동기로 스캔하여) 갱신하고 (답장 ID, 발신자 ID) 반환"""
+    index = th._THREAD_INDEX
+    room_id, thread_id = int(chat.room.id), int(thread_id)
+    room = index._room(room_id)
+    with room.lock:
+        ranges, generation = index._plan(room, thread_id), room.generation
+    for after, upto in ranges:
+        last_id = after
+        while True:
+            rows = await _aquery_planned(transport, lambda planned: index._page_query(room_id, last_id, upto, planned))
+            th._count("rows_scanned", len(rows))
+            last_id = index._apply_page(room, generation, after, upto, rows, await _adecode_supplements(transport, rows), last_id)
+            if len(rows) < index.page_size: break
+    result = index._indexed(room, generation, thread_id)
+    if result is not None: return result
+    # 스캔 중 방이 초기화됐거나 상한을 넘은 스레드는 저장하지 않고 직접 스캔
+    ids, senders, last_id = [], [], thread_id
+    while True:
+        rows = await _aquery_planned(transport, lambda planned: index._page_query(room_id, last_id, None, planned))
+        th._count("rows_scanned", len(rows))
+        last_id = index._collect(rows, await _adecode_supplements(transport, rows), thread_id, ids, senders, last_id)
+        if len(rows) < index.page_size: return ids, senders
+
+async def aget_thread_id(chat: ChatContext, transport: Optional[AsyncIrisTransport] = None) -> Optional[int]:
+    """현재 메시지의 원본 스레드 ID 반환"""
+    try:
+        supplement = chat.raw.get("supplement", "")
+        user_id = int(chat.raw.get("user_id", chat.sender.id))
+        if not supplement: return None
+        data = (await _adecode_supplements(_transport_for(chat, transport), [{"supplement": supplement, "user_id": user_id}]))[0]
+        if data and "threadId" in data:
+            thread_id = int(data["threadId"])
+            th._THREAD_INDEX.add(chat.room.id, thread_id, chat.message.id, user_id)
+            return thread_id
+    except Exception: th._swallowed("aget_thread_id")
+    return None
+
+async def aget_thread_source(chat: ChatContext, transport: Optional[AsyncIrisTransport] = None) -> Optional[ChatContext]:
+    """스레드의 원본 메시지 객체 조회"""
+    if chat.message.type == 26: return await asyncio.to_thread(chat.get_source)
+    transport = _transport_for(chat, transport)
+    thread_id = await aget_thread_id(chat, transport)
+    if not thread_id: return None
+    key = (int(chat.room.id), int(thread_id))
+    record = th._SOURCE_CACHE.get(key)
+    if record is None:
+        try: record = await transport.single_flight(("source",) + key, lambda: _aload_source(transport, key))
+        except Exception: return th._swallowed("aget_thread_source")
+        if record is None: return None
+    built = await _abuild(chat, transport, [dict(record)])
+    return built[0] if built else None
+
+async def _aload_source(transport: AsyncIrisTransport, key: tuple) -> Optional[dict]:
+    result = await _aquery_records(transport, "id = ?", [key[1]])
+    if not result: return None
+    th._SOURCE_CACHE.set(key, result[0])
+    return result[0]
+
+async def aiter_thread_messages(chat: ChatContext, source_message_id: int, page_size: int = 50, transport: Optional[AsyncIrisTransport] = None,
+                                after_id: Optional[int] = None):
+    """답장을 키셋 페이지 단위로 생성하는 비동기 제너레이터 (after_id를 주면 그 ID 이후의 답장만)"""
+    transport = _transport_for(chat, transport)
+    page_size = max(1, min(int(page_size), th._MAX_BIND_VARS))
+    reply_ids, _ = await _athread_replies(chat, transport, int(source_message_id))
+    last_id = max(int(source_message_id), int(after_id or 0))
+    while True:
+        start = bisect.bisect_right(reply_ids, last_id)
+        page_ids = reply_ids[start:start + page_size]
+        if not page_ids: return
+        last_id = page_ids[-1]
+        records = await _afetch_records(transport, page_ids)
+        th._count("rows_scanned", len(records))
+        th._count("rows_matched", len(records))
+        for thread_chat in await _abuild(chat, transport, records):
+            yield thread_chat
+
+async def aget_thread_messages(chat: ChatContext, source_message_id: int, limit: int = 50, transport: Optional[AsyncIrisTransport] = None) -> List[ChatContext]:
+    """특정 원본에 달린 답장 리스트 조회"""
+    if limit <= 0: return []
+    replies = []
+    try:
+        async for thread_chat in aiter_thread_messages(chat, source_message_id, page_size=limit, transport=transport):
+            replies.append(thread_chat)
+            if len(replies) >= limit: break
+    except Exception: th._swallowed("aget_thread_messages")
+    return replies
+
+async def asend_to_thread(chat: ChatContext, message: str, thread_id: Union[str, int] = None, transport: Optional[AsyncIrisTransport] = None) -> bool:
+    """특정 스레드로 메시지 전송"""
+    transport = _transport_for(chat, transport)
+    if not thread_id:
+        tid = await aget_thread_id(chat, transport)
+        if tid: thread_id = tid
+        else:
+            source = await aget_thread_source(chat, transport)
+            if source: thread_id = source.message.id
+
+    payload = {
+        "type": "text",
+        "room": str(chat.room.id),
+        "data": message,
+        "threadId": str(thread_id) if thread_id else None
+    }
+    return await transport.reply(payload)
+
+async def aload_thread_snapshot(chat: ChatContext, limit: int = 500, transport: Optional[AsyncIrisTransport] = None) -> th.ThreadSnapshot:
+    """원본과 앞쪽 limit개 답장을 한 번에 읽어 ThreadSnapshot 생성 (답장이 더 있으면 truncated)"""
+    transport = _transport_for(chat, transport)
+    with th._count_fetches() as counter:
+        source = await aget_thread_source(chat, transport)
+        replies = await aget_thread_messages(chat, source.message.id, limit=limit + 1, transport=transport) if source else []
+    return th.ThreadSnapshot(source, replies[:limit], fetch_count=counter[0], truncated=len(replies) > limit)
+
+async def aload_thread_updates(chat: ChatContext, snapshot: th.ThreadSnapshot, limit: int = 500, transport: Optional[AsyncIrisTransport] = None) -> th.ThreadSnapshot:
+    """snapshot의 마지막 답장 이후(id > last_seen_id)만 조회하여 병합한 새 스냅샷"""
+    if snapshot.source is None: return snapshot.merge([], reason=snapshot.reason)
+    added = []
+    with th._count_fetches() as counter:
+        try:
+            async for thread_chat in aiter_thread_messages(chat, snapshot.source.message.id, page_size=limit, transport=transport,
+                                                           after_id=snapshot.last_seen_id):
+                added.append(thread_chat)
+                if len(added) >= limit: break
+        except Exception: added = th._swallowed("aload_thread_updates", [])
+    return snapshot.merge(added, fetch_count=counter[0], limit=limit)
+
+class AsyncThread:
+    """Thread의 비동기 버전 (스냅샷 기반)"""
+    snapshot_limit = 500
+
+    def __init__(self, chat: ChatContext, transport: Optional[AsyncIrisTransport] = None):
+        self._chat = chat
+        self._transport = transport
+        self._snapshot = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def transport(self) -> AsyncIrisTransport:
+        return _transport_for(self._chat, self._transport)
+
+    async def id(self) -> Optional[int]:
+        """원본 메시지 ID"""
+        return await aget_thread_id(self._chat, self.transport)
+
+    async def snapshot(self) -> th.ThreadSnapshot:
+        """최초 호출 시 한 번만 로드되는 스레드 스냅샷"""
+        async with self._lock:
+            if self._snapshot is None:
+                self._snapshot = await aload_thread_snapshot(self._chat, limit=self.snapshot_limit, transport=self.transport)
+            return self._snapshot
+
+    async def refresh(self, full: bool = False) -> th.ThreadSnapshot:
+        """스냅샷 갱신: 마지막으로 본 답장 이후의 새 답장만 조회하여 병합 (full=True면 전체 재로드)"""
+        async with self._lock:
+            if full or self._snapshot is None:
+                self._snapshot = await aload_thread_snapshot(self._chat, limit=self.snapshot_limit, transport=self.transport)
+            else:
+                self._snapshot = await aload_thread_updates(self._chat, self._snapshot, limit=self.snapshot_limit, transport=self.transport)
+            return self._snapshot
+
+    async def updates(self) -> List[ChatContext]:
+        """마지막 확인 이후 새로 달린 답장 목록 (첫 호출은 현재까지의 전체 답장)"""
+        return list((await self.refresh()).added)
+
+    async def source(self) -> ChatContext:
+        """원본 메시지 (Fallback 포함)"""
+        return (await self.snapshot()).source or self._chat
+
+    async def raw(self) -> Optional[Dict[str, Any]]:
+        snap = await self.snapshot()
+        return th._thread_dict_from(self._chat, snap.source, snap.replies) if snap.source else None
+
+    async def stats(self) -> Dict[str, Any]:
+        d = await self.raw()
+        return d.get("metadata", {}) if d else {}
+
+    async def summary(self) -> Dict[str, Any]:
+        return th._summary_from(await self.raw())
+
+    async def participants(self) -> List[th.ThreadParticipant]:
+        snap = await self.snapshot()
+        return [th.ThreadParticipant(**p) for p in th._participants_from(self._chat, snap.source, snap.replies)]
+
+    async def is_starter(self) -> bool:
+        source = (await self.snapshot()).source
+        return bool(source) and str(source.sender.id) == str(self._chat.sender.id)
+
+    async def timeline(self, limit: int = 50) -> List[Dict[str, Any]]:
+        snap = await self.snapshot()
+        if not snap.source: return []
+        return th._timeline_from([snap.source] + list(snap.replies[:max(limit, 0)]))
+
+    async def get_context(self, limit: int = 5) -> List[ChatContext]:
+        snap = await self.snapshot()
+        if not snap.source: return [self._chat]
+        return th._context_from(self._chat, snap.source, list(snap.replies[:20]), limit)
+
+    async def messages(self, limit: int = 50) -> List[ChatContext]:
+        tid = await self.id() or self._chat.message.id
+        return await aget_thread_messages(self._chat, tid, limit=limit, transport=self.transport)
+
+    async def send(self, message: str, target_id: Union[str, int] = None) -> bool:
+        """이 스레드 또는 특정 메시지에 답장 전송"""
+        tid = target_id if target_id else await self.id()
+        return await asend_to_thread(self._chat, message, thread_id=tid, transport=self.transport)
+
+    def __repr__(self):
+        return f"[object AsyncThread(chat={self._chat.message.id})]"
@@ -0,0 +1,245 @@
+"""스레드 메시지를 NDJSON 또는 Parquet 파일로 스트리밍 내보내기
+
+    # 방 전체 스레드 기록 (중단되면 같은 명령으로 체크포인트부터 이어서 실행)
+    python thread_export.py room.ndjson --endpoint http://127.0.0.1:3000 --room 18219201472247343
+    # 특정 스레드만 Parquet으로 (pyarrow 필요)
+    python thread_export.py threads.parquet --endpoint http://127.0.0.1:3000 --room 18219201472247343 --thread 123 456
+
+각 행은 id, thread_id, sender_id, name, text, created_at 컬럼이며, 원본 메시지는 thread_id == id인 행입니다.
+페이지 단위로 조회·복호화하고 batch_size행마다 파일에 쓰므로 메모리 사용량은 기록 길이와 관계없이 일정하며,
+유저 정보와 복호화 결과는 thread_helper의 캐시를 그대로 사용합니다.
+"""
+import argparse
+import json
+import os
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+
+from iris import ChatContext
+from iris.bot.models import Message, Room, User
+
+try:
+    from . import thread_helper as th
+except ImportError:
+    import thread_helper as th
+
+try:
+    import pyarrow as _pa
+    import pyarrow.parquet as _pq
+except ImportError:
+    _pa = None
+
+def _row(message: ChatContext, thread_id: int) -> Dict[str, Any]:
+    return {
+        "id": message.message.id,
+        "thread_id": thread_id,
+        "sender_id": message.sender.id,
+        "name": message.sender.name,
+        "text": message.message.msg,
+        "created_at": int(message.raw.get("created_at") or 0),
+    }
+
+def _page_rows(chat: ChatContext, records: List[dict], thread_of: Dict[int, int]) -> List[Dict[str, Any]]:
+    """레코드 묶음을 일괄 유저 조회·복호화하여 행으로 변환 (thread_of: 메시지 ID -> 스레드 ID)"""
+    user_cache = th._prepare_records(chat, records)
+    rows = []
+    for record in records:
+        message = th._make_chat_from_record(chat, record, user_cache)
+        if message: rows.append(_row(message, thread_of[message.message.id]))
+    return rows
+
+def iter_thread_pages(chat: ChatContext, thread_id: int, after_id: Optional[int] = None, page_size: int = 500) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """스레드 하나를 (마지막 메시지 ID, 행 목록) 페이지로 생성 (after_id가 없으면 원본 메시지부터)"""
+    thread_id = int(thread_id)
+    page_size = max(1, min(int(page_size), th._MAX_BIND_VARS))
+    if after_id is None or int(after_id) < thread_id:
+        records = th._fetch_records(chat.api, [thread_id])
+        yield thread_id, _page_rows(chat, records, {thread_id: thread_id})
+        after_id = thread_id
+    for records in th._iter_index_pages(chat, thread_id, page_size, after_id):
+        yield int(records[-1]["id"]), _page_rows(chat, records, {int(r["id"]): thread_id for r in records})
+
+def iter_room_pages(chat: ChatContext, since_id: Optional[int] = None, until_id: Optional[int] = None, page_size: int = 500,
+                    exported_sources: Optional[set] = None) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """방의 스레드 답장을 ID 순서로 스캔하여 (마지막 스캔 ID, 행 목록) 페이지로 생성
+
+    처음 보는 스레드의 원본 메시지는 그 스레드의 첫 답장과 같은 페이지에 함께 들어가며,
+    exported_sources에 기록되어 다시 내보내지 않습니다.
+    """
+    room_id = int(chat.room.id)
+    page_size = max(1, min(int(page_size), th._MAX_BIND_VARS))
+    sources = exported_sources if exported_sources is not None else set()
+    last_id = int(since_id or 0)
+    while True:
+        scanned, planned = th._query_planned(chat.api, lambda planned: th._room_page_query(room_id, last_id, until_id, page_size, planned))
+        if not scanned: return
+        th._count("rows_scanned", len(scanned))
+        last_id = int(scanned[-1]["id"])
+        thread_of = {}
+        for record, data in zip(scanned, th._decode_supplements(chat, scanned)):
+            try:
+                thread_id = record.get("_tid") or (data.get("threadId") if data else None)
+                if thread_id: thread_of[int(record["id"])] = int(thread_id)
+            except Exception: th._swallowed("thread_export.scan")
+        new_sources = set(thread_of.values()) - sources
+        for sid in new_sources: thread_of.setdefault(sid, sid)
+        th._count("rows_matched", len(thread_of))
+        rows = _page_rows(chat, th._fetch_records(chat.api, sorted(thread_of)), thread_of) if thread_of else []
+        sources.update(new_sources)
+        yield last_id, rows
+        if len(scanned) < page_size: return
+
+class _NDJSONWriter:
+    def __init__(self, path: str, offset: Optional[int] = None):
+        # 재개 시 마지막 체크포인트 이후에 쓰인 행은 잘라내고 이어서 씀
+        if offset is not None and os.path.exists(path):
+            self._f = open(path, "r+", encoding="utf-8")
+            self._f.seek(offset)
+            self._f.truncate()
+        else:
+            self._f = open(path, "w", encoding="utf-8")
+        self.path = path
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows))
+        self._f.flush()
+
+    def offset(self) -> int:
+        return self._f.tell()
+
+    def close(self):
+        self._f.close()
+
+class _ParquetWriter:
+    """배치마다 파트 파일 하나를 임시 이름으로 쓰고 이름을 바꿔 확정 (offset: 확정된 파트 수)
+
+    Parquet 파일은 닫기 전에는 읽을 수 없고 이어 쓸 수도 없으므로, 체크포인트는 확정된 파트까지만 가리킵니다.
+    재개할 때 체크포인트 이후의 파트(확정 직후 체크포인트 저장 전에 중단된 배치)는 지우고 다시 씁니다.
+    """
+    def __init__(self, path: str, offset: Optional[int] = None):
+        if _pa is None: raise RuntimeError("parquet 출력에는 pyarrow가 필요합니다")
+        self.path = path
+        self._root, self._ext = os.path.splitext(path)
+        self._schema = _pa.schema([("id", _pa.int64()), ("thread_id", _pa.int64()), ("sender_id", _pa.int64()),
+                                   ("name", _pa.string()), ("text", _pa.string()), ("created_at", _pa.int64())])
+        self._parts = int(offset or 0)
+        n = self._parts
+        while os.path.exists(self._part(n)):
+            os.remove(self._part(n))
+            n += 1
+
+    def _part(self, n: int) -> str:
+        return self.path if n == 0 else f"{self._root}.{n}{self._ext}"
+
+    def _commit(self, rows: List[Dict[str, Any]]):
+        part = self._part(self._parts)
+        _pq.write_table(_pa.Table.from_pylist(rows, schema=self._schema), part + ".tmp")
+        os.replace(part + ".tmp", part)
+        self._parts += 1
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._commit(rows)
+
+    def offset(self) -> int:
+        return self._parts
+
+    def close(self):
+        # 내보낸 행이 없어도 빈 파일로 스키마를 남김
+        if self._parts == 0: self._commit([])
+
+_WRITERS = {"ndjson": _NDJSONWriter, "parquet": _ParquetWriter}
+
+def _load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path): return None
+    with open(path, encoding="utf-8") as f: return json.load(f)
+
+def _save_checkpoint(path: str, state: Dict[str, Any]):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(state, f)
+    os.replace(tmp, path)
+
+def _format_of(path: str, fmt: Optional[str]) -> str:
+    if fmt: return fmt
+    return "parquet" if path.endswith(".parquet") else "ndjson"
+
+def export(chat: ChatContext, path: str, thread_ids: Optional[List[int]] = None, fmt: Optional[str] = None,
+           since_id: Optional[int] = None, until_id: Optional[int] = None, batch_size: int = 1000, page_size: int = 500,
+           checkpoint: Optional[str] = None, resume: bool = True) -> Dict[str, Any]:
+    """스레드(thread_ids) 또는 방 전체 스레드 기록을 path에 내보내고 통계를 반환
+
+    batch_size행이 모일 때마다 파일에 쓰고 체크포인트(기본: path + ".ckpt")에 마지막 ID를 기록합니다.
+    resume=True이면 체크포인트 이후부터 이어서 내보냅니다.
+    """
+    fmt = _format_of(path, fmt)
+    checkpoint = checkpoint or path + ".ckpt"
+    state = _load_checkpoint(checkpoint) if resume else None
+    if state is None: state = {"format": fmt, "last_ids": {}, "sources": [], "rows": 0, "offset": None}
+    writer = _WRITERS[fmt](path, state["offset"])
+    sources = set(state["sources"])
+    last_ids = state["last_ids"]
+
+    buffer, batches = [], 0
+    def _flush():
+        nonlocal batches
+        if buffer:
+            writer.write(buffer)
+            batches += 1
+        state["rows"] += len(buffer)
+        state["offset"] = writer.offset()
+        state["sources"] = sorted(sources)
+        _save_checkpoint(checkpoint, state)
+        buffer.clear()
+
+    def _streams():
+        if not thread_ids:
+            yield "room", iter_room_pages(chat, last_ids.get("room", since_id), until_id, page_size, sources)
+            return
+        for tid in thread_ids:
+            key = str(int(tid))
+            yield key, iter_thread_pages(chat, tid, last_ids.get(key), page_size)
+
+    try:
+        for key, pages in _streams():
+            for last_id, rows in pages:
+                buffer.extend(rows)
+                last_ids[key] = last_id
+                if len(buffer) >= batch_size: _flush()
+        _flush()
+    finally:
+        writer.close()
+    return {"path": writer.path, "format": fmt, "rows": state["rows"], "batches": batches, "last_ids": dict(last_ids), "checkpoint": checkpoint}
+
+def room_chat(api_wrapper, room_id: int) -> ChatContext:
+    """봇 이벤트 없이 내보내기를 실행할 때 쓰는 방 단위 ChatContext"""
+    room = Room(id=int(room_id), name="", api=api_wrapper)
+    sender = User(id=0, chat_id=int(room_id), api=api_wrapper, name="", bot_id=0)
+    message = Message(id=0, type=0, msg="", attachment="", v={})
+    return ChatContext(room=room, sender=sender, message=message, raw={"chat_id": int(room_id)}, api=api_wrapper, _bot_id=0)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="스레드 메시지를 NDJSON / Parquet으로 내보내기")
+    parser.add_argument("output", help="출력 파일 (.parquet이면 Parquet, 그 외 NDJSON)")
+    parser.add_argument("--endpoint", required=True, help="Iris 서버 주소")
+    parser.add_argument("--room", type=int, required=True, help="방 ID (chat_id)")
+    parser.add_argument("--thread", type=int, nargs="*", help="내보낼 스레드 원본 메시지 ID (없으면 방 전체)")
+    parser.add_argument("--format", choices=sorted(_WRITERS), help="출력 형식 (기본: 확장자로 판단)")
+    parser.add_argument("--since-id", type=int, help="방 전체 내보내기의 시작 메시지 ID (이 ID 다음부터)")
+    parser.add_argument("--until-id", type=int, help="방 전체 내보내기의 마지막 메시지 ID")
+    parser.add_argument("--batch-size", type=int, default=1000, help="파일에 한 번에 쓰는 행 수")
+    parser.add_argument("--page-size", type=int, default=500, help="조회 페이지 크기")
+    parser.add_argument("--checkpoint", help="체크포인트 경로 (기본: output + .ckpt)")
+    parser.add_argument("--restart", action="store_true", help="체크포인트를 무시하고 처음부터 내보내기")
+    parser.add_argument("--local-decrypt", action="store_true", help="kakao_decrypt 로컬 복호화 사용")
+    args = parser.parse_args(argv)
+
+    from iris.bot._internal.iris import IrisAPI
+    if args.local_decrypt:
+        try: from . import kakao_decrypt
+        except ImportError: import kakao_decrypt
+        th.set_decrypt_backend(kakao_decrypt.LocalDecryptor())
+    chat = room_chat(IrisAPI(args.endpoint), args.room)
+    report = export(chat, args.output, thread_ids=args.thread, fmt=args.format, since_id=args.since_id, until_id=args.until_id,
+                    batch_size=args.batch_size, page_size=args.page_size, checkpoint=args.checkpoint, resume=not args.restart)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
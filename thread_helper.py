@@ -1,49 +1,694 @@
+import asyncio
 import json
+import os
 import re
+import sqlite3
 import time
 import sys
+import bisect
+import threading
+import unicodedata
+import queue
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict
 from functools import wraps
-from typing import Optional, List, Dict, Any, Union, Set
-
-from iris import ChatContext
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from concurrent.futures import Future, ThreadPoolExecutor, wait as _wait_futures
+from collections import deque
+from types import MappingProxyType
+from itertools import islice
+from typing import Optional, List, Dict, Any, Union, Set, Iterator
+
+from iris import ChatContext, Bot
 from iris.bot.models import Message, Room, User
 from iris.bot._internal.iris import IrisAPI
 
 _GLOBAL_SESSION = requests.Session()
 
-class SimpleTTLCache:
-    def __init__(self, max_size=2000, ttl=300):
-        self.cache = {}
+def configure_session(pool_connections: int = 10, pool_maxsize: int = 10, max_retries: int = 0, backoff_factor: float = 0.3, keep_alive: bool = True) -> requests.Session:
+    """답장 전송용 공유 세션 재구성 (커넥션 풀 크기, keep-alive, 전송 계층 재시도)
+
+    max_retries는 연결 실패와 502/503/504 응답에 대한 재시도 횟수입니다.
+    POST도 재시도하므로 서버가 요청을 처리한 뒤 응답만 실패한 경우 중복 전송될 수 있습니다.
+    """
+    global _GLOBAL_SESSION
+    session = requests.Session()
+    retry = Retry(total=max_retries, connect=max_retries, read=max_retries, backoff_factor=backoff_factor,
+                  status_forcelist=(502, 503, 504), allowed_methods=None, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not keep_alive: session.headers["Connection"] = "close"
+    old, _GLOBAL_SESSION = _GLOBAL_SESSION, session
+    try: old.close()
+    except Exception: _swallowed("configure_session")
+    return session
+
+def _on_event_loop() -> bool:
+    """asyncio 이벤트 루프 스레드에서 호출됐는지 (L2 저장소의 동기 I/O로 루프를 막지 않도록)"""
+    try: asyncio.get_running_loop()
+    except RuntimeError: return False
+    return True
+
+def _sizeof(obj) -> int:
+    """캐시 바이트 예산 계산용 대략적인 객체 크기"""
+    if isinstance(obj, (tuple, list)): return sys.getsizeof(obj) + sum(_sizeof(o) for o in obj)
+    if isinstance(obj, dict): return sys.getsizeof(obj) + sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    return sys.getsizeof(obj)
+
+class LRUCache:
+    """스레드 안전한 LRU + TTL 캐시
+
+    - 조회 시 최근 사용 순서를 갱신하고, 가장 오래 사용되지 않은 항목부터 제거합니다.
+    - 만료 항목은 조회 시점뿐 아니라 sweep_every번의 연산마다 일괄 정리됩니다.
+    - max_bytes를 지정하면 키+값의 대략적인 크기 합계로도 제한합니다.
+    """
+    def __init__(self, max_size: int = 2000, ttl: float = 300, max_bytes: Optional[int] = None, sizeof=None, sweep_every: int = 64):
         self.max_size = max_size
         self.ttl = ttl
-
-    def get(self, key):
-        if key in self.cache:
-            value, expire_time = self.cache[key]
-            if time.time() < expire_time:
-                return value
-            del self.cache[key]
-        return None
+        self.max_bytes = max_bytes
+        self.sweep_every = sweep_every
+        self._sizeof = sizeof or _sizeof
+        self._data = OrderedDict()
+        self._expiry = OrderedDict()
+        self._lock = threading.Lock()
+        self._ops = 0
+        self.store = None
+        self.namespace = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def attach_store(self, store, namespace: str):
+        """L2 저장소 연결 (None이면 해제). 미스 시 저장소에서 읽고, 쓰기는 저장소에도 반영
+
+        이벤트 루프 스레드에서의 호출은 저장소를 건너뜁니다 (thread_async는 executor에서 저장소를 조회).
+        """
+        self.store = store
+        self.namespace = namespace
+
+    def get(self, key, default=None):
+        with self._lock:
+            now = time.monotonic()
+            self._tick(now)
+            entry = self._data.get(key)
+            if entry is not None and entry[1] <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if self.store is None or _on_event_loop():
+                self.misses += 1
+                return default
+
+        try: stored = self.store.get(self.namespace, key)
+        except Exception: stored = _swallowed("LRUCache.get")
+        with self._lock:
+            if stored is None:
+                self.misses += 1
+                return default
+            self.store_hits += 1
+        value, expires_at = stored
+        self._set_local(key, value, min(self.ttl, expires_at - time.time()))
+        return value
+
+    def peek(self, key, default=None):
+        """L1에서만 조회 (미스는 집계하지 않으므로 이어서 get()으로 저장소까지 조회하는 호출자용)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= time.monotonic(): return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
 
     def set(self, key, value):
-        if len(self.cache) >= self.max_size:
-            overflow = int(self.max_size * 0.2)
-            for _ in range(overflow):
-                try:
-                    self.cache.pop(next(iter(self.cache)))
-                except: break
-        self.cache[key] = (value, time.time() + self.ttl)
+        self._set_local(key, value, self.ttl)
+        store = self.store
+        if store is not None and not _on_event_loop():
+            try: store.set(self.namespace, key, value, time.time() + self.ttl)
+            except Exception: _swallowed("LRUCache.set")
+
+    def _set_local(self, key, value, ttl: float):
+        if ttl <= 0: return
+        size = self._sizeof(key) + self._sizeof(value) if self.max_bytes else 0
+        with self._lock:
+            now = time.monotonic()
+            self._tick(now)
+            if key in self._data: self._remove(key)
+            if self.max_bytes and size > self.max_bytes: return
+            expire_time = now + ttl
+            self._data[key] = (value, expire_time, size)
+            self._expiry[key] = expire_time
+            self.bytes += size
+            while self._data and (len(self._data) > self.max_size or (self.max_bytes and self.bytes > self.max_bytes)):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data: self._remove(key)
+        if self.store is not None and not _on_event_loop():
+            try: self.store.delete(self.namespace, key)
+            except Exception: _swallowed("LRUCache.delete")
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[1] > time.monotonic()
 
-_USER_INFO_CACHE = SimpleTTLCache(max_size=2000, ttl=300)
-_DECRYPT_CACHE = SimpleTTLCache(max_size=5000, ttl=600)
+    def stats(self) -> Dict[str, Any]:
+        """캐시 적중/미스/제거 통계"""
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "store_hits": self.store_hits,
+                "hit_rate": (self.hits + self.store_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._data),
+                "bytes": self.bytes,
+            }
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        self._expiry.pop(key, None)
+        self.bytes -= entry[2]
+
+    def _tick(self, now: float):
+        self._ops += 1
+        if self._ops % self.sweep_every: return
+        expiry = self._expiry
+        while expiry:
+            key, expire_time = next(iter(expiry.items()))
+            if expire_time > now: break
+            self._remove(key)
+            self.expirations += 1
+
+SimpleTTLCache = LRUCache
+
+class SQLiteCacheStore:
+    """여러 봇 프로세스가 공유하는 SQLite 기반 L2 캐시 저장소
+
+    LRUCache.attach_store()로 연결하며 (namespace, key) -> (value, 만료 시각)을 저장합니다.
+    같은 인터페이스(get / set / delete)를 구현하면 다른 저장소로 교체할 수 있습니다.
+    연결은 첫 사용 시 프로세스별로 열리고, WAL 모드라 여러 프로세스가 동시에 읽을 수 있습니다.
+    """
+    def __init__(self, path: str, timeout: float = 5.0, purge_every: int = 1000):
+        self.path = path
+        self.timeout = timeout
+        self.purge_every = purge_every
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (ns, key)) WITHOUT ROWID")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _key(key) -> str:
+        return json.dumps(key, ensure_ascii=False, separators=(',', ':'))
+
+    def get(self, namespace: str, key):
+        with self._lock:
+            row = self._connect().execute("SELECT value, expires FROM cache WHERE ns = ? AND key = ?", (namespace, self._key(key))).fetchone()
+        if not row or row[1] <= time.time(): return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, namespace: str, key, value, expires_at: float):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO cache (ns, key, value, expires) VALUES (?, ?, ?, ?)", (namespace, self._key(key), json.dumps(value, ensure_ascii=False), expires_at))
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+
+    def delete(self, namespace: str, key):
+        with self._lock:
+            self._connect().execute("DELETE FROM cache WHERE ns = ? AND key = ?", (namespace, self._key(key)))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid(): self._conn.close()
+            self._conn = None
+
+_USER_INFO_CACHE = LRUCache(max_size=2000, ttl=300)
+_DECRYPT_CACHE = LRUCache(max_size=5000, ttl=600, max_bytes=8 * 1024 * 1024)
+
+# 스레드 원본 메시지는 사실상 불변이므로 길게 보관하고, 삭제/가리기 이벤트에서만 무효화
+# (ChatContext는 요청마다 속성이 붙으므로 레코드만 보관하고 조회할 때마다 새로 만듦)
+_SOURCE_CACHE = LRUCache(max_size=1000, ttl=3600)
+
+# 부정 캐시: 조회 결과가 없던 유저 / 복호화 실패 항목을 짧게 기억하여 반복 조회를 막음
+_USER_MISS_CACHE = LRUCache(max_size=2000, ttl=60)
+_DECRYPT_MISS_CACHE = LRUCache(max_size=5000, ttl=120, max_bytes=2 * 1024 * 1024)
+
+def set_cache_store(store) -> None:
+    """유저 정보·복호화 캐시의 L2 저장소 설정 (예: SQLiteCacheStore("iris_cache.db"), None이면 해제)"""
+    _USER_INFO_CACHE.attach_store(store, "user_info")
+    _DECRYPT_CACHE.attach_store(store, "decrypt")
+
+def clear_caches() -> None:
+    """모든 모듈 캐시와 스레드 인덱스 초기화 (벤치마크의 콜드 측정 등)"""
+    for cache in (_USER_INFO_CACHE, _DECRYPT_CACHE, _SOURCE_CACHE, _USER_MISS_CACHE, _DECRYPT_MISS_CACHE):
+        cache.clear()
+    _THREAD_INDEX.clear()
+    _NICKNAME_INDEXES.clear()
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """모듈 캐시별 적중/미스/제거 통계 (캐시 크기 조정용)"""
+    return {
+        "user_info": _USER_INFO_CACHE.stats(),
+        "decrypt": _DECRYPT_CACHE.stats(),
+        "source": _SOURCE_CACHE.stats(),
+        "user_miss": _USER_MISS_CACHE.stats(),
+        "decrypt_miss": _DECRYPT_MISS_CACHE.stats(),
+    }
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.event.wait()
+        if self.error is not None: raise self.error
+        return self.result
+
+class SingleFlight:
+    """같은 키에 대한 동시 조회를 하나로 합침
+
+    먼저 도착한 호출자만 실제 I/O를 수행하고, 같은 키로 동시에 들어온 호출자는
+    그 결과를 기다렸다가 공유합니다. deduplicated는 합쳐진 호출 수입니다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.deduplicated = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader: call = self._calls[key] = _Call()
+            else: self.deduplicated += 1
+        if not leader:
+            try: return call.wait()
+            except DeadlineExceeded:
+                # 먼저 온 호출자의 예산 초과는 그 호출자만의 실패이므로 자신의 예산으로 다시 시도
+                d = _DEADLINE.get()
+                if d is not None: d.check("single_flight")
+                return self.do(key, fn)
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock: self._calls.pop(key, None)
+            call.event.set()
+
+    def do_many(self, keys, fn) -> Dict[Any, Any]:
+        """진행 중인 키는 기다리고 나머지 키만 fn(keys) -> {key: value}로 조회"""
+        owned, waiting = [], []
+        with self._lock:
+            for key in keys:
+                self.calls += 1
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    owned.append((key, call))
+                else:
+                    self.deduplicated += 1
+                    waiting.append((key, call))
+
+        result = {}
+        if owned:
+            try:
+                fetched = fn([key for key, _ in owned]) or {}
+                for key, call in owned:
+                    call.result = fetched.get(key)
+                    if call.result is not None: result[key] = call.result
+            except BaseException as e:
+                for _, call in owned: call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key, _ in owned: self._calls.pop(key, None)
+                for _, call in owned: call.event.set()
+
+        for key, call in waiting:
+            try: value = call.wait()
+            except Exception: continue
+            if value is not None: result[key] = value
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "deduplicated": self.deduplicated, "in_flight": len(self._calls)}
+
+_SOURCE_FLIGHT = SingleFlight()
+_USER_FLIGHT = SingleFlight()
+_DECRYPT_FLIGHT = SingleFlight()
+
+def coalescing_stats() -> Dict[str, Dict[str, int]]:
+    """원본 조회·유저 조회·복호화별 요청 병합 통계"""
+    return {"source": _SOURCE_FLIGHT.stats(), "users": _USER_FLIGHT.stats(), "decrypt": _DECRYPT_FLIGHT.stats()}
+
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Metrics:
+    """연산별 호출 수·지연 히스토그램, 카운터, 삼킨 예외 집계
+
+    hooks에 등록된 콜러블은 hook(kind, name, value)로 호출됩니다.
+    kind는 "timing"(value: 초), "counter"(value: 증가량), "error"(value: 예외 객체) 중 하나입니다.
+    """
+    def __init__(self, buckets=_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.hooks = []
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._counters = {}
+        self._errors = {}
+
+    def observe(self, op: str, seconds: float, ok: bool = True):
+        with self._lock:
+            t = self._timings.get(op)
+            if t is None: t = self._timings[op] = [0, 0.0, 0, [0] * (len(self.buckets) + 1)]
+            t[0] += 1
+            t[1] += seconds
+            if not ok: t[2] += 1
+            t[3][bisect.bisect_left(self.buckets, seconds)] += 1
+        self._emit("timing", op, seconds)
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock: self._counters[name] = self._counters.get(name, 0) + n
+        self._emit("counter", name, n)
+
+    def error(self, site: str, exc: Optional[BaseException]):
+        with self._lock: self._errors[site] = self._errors.get(site, 0) + 1
+        self._emit("error", site, exc)
+
+    def _emit(self, kind: str, name: str, value):
+        for hook in self.hooks:
+            try: hook(kind, name, value)
+            except Exception: pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            operations = {}
+            for op, (count, total, errors, counts) in self._timings.items():
+                cumulative, histogram = 0, {}
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    histogram[str(bound)] = cumulative
+                operations[op] = {
+                    "count": count,
+                    "errors": errors,
+                    "total_ms": round(total * 1000, 3),
+                    "avg_ms": round(total * 1000 / count, 3) if count else 0.0,
+                    "histogram": histogram,
+                }
+            return {"operations": operations, "counters": dict(self._counters), "swallowed": dict(self._errors)}
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+            self._errors.clear()
+
+_METRICS = Metrics()
+_METRICS_ENABLED = False
+
+def enable_metrics(enabled: bool = True) -> None:
+    """metrics() 집계 활성화 (비활성 상태에서는 플래그 확인 외의 비용이 없음)"""
+    global _METRICS_ENABLED
+    _METRICS_ENABLED = enabled
+
+def add_metrics_hook(hook) -> None:
+    """측정값마다 hook(kind, name, value)를 호출하도록 등록 (enable_metrics() 필요)"""
+    _METRICS.hooks.append(hook)
+
+def remove_metrics_hook(hook) -> None:
+    if hook in _METRICS.hooks: _METRICS.hooks.remove(hook)
+
+def reset_metrics() -> None:
+    _METRICS.reset()
+
+def metrics() -> Dict[str, Any]:
+    """연산별 지연 히스토그램, 스캔/매칭 행 수, 삼킨 예외 수, 캐시 적중률 스냅샷"""
+    snap = _METRICS.snapshot()
+    snap["enabled"] = _METRICS_ENABLED
+    snap["caches"] = cache_stats()
+    snap["coalescing"] = coalescing_stats()
+    snap["thread_index"] = _THREAD_INDEX.stats()
+    return snap
+
+def metrics_prometheus(prefix: str = "thread_helper") -> str:
+    """metrics()를 Prometheus 텍스트 형식으로 변환"""
+    snap = metrics()
+    lines = [f"# TYPE {prefix}_op_seconds histogram"]
+    for op, data in snap["operations"].items():
+        for bound, n in data["histogram"].items():
+            le = "+Inf" if bound == "inf" else bound
+            lines.append(f'{prefix}_op_seconds_bucket{{op="{op}",le="{le}"}} {n}')
+        lines.append(f'{prefix}_op_seconds_sum{{op="{op}"}} {data["total_ms"] / 1000}')
+        lines.append(f'{prefix}_op_seconds_count{{op="{op}"}} {data["count"]}')
+    lines.append(f"# TYPE {prefix}_op_errors_total counter")
+    lines.extend(f'{prefix}_op_errors_total{{op="{op}"}} {data["errors"]}' for op, data in snap["operations"].items())
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    lines.extend(f'{prefix}_events_total{{name="{name}"}} {n}' for name, n in snap["counters"].items())
+    lines.append(f"# TYPE {prefix}_swallowed_exceptions_total counter")
+    lines.extend(f'{prefix}_swallowed_exceptions_total{{site="{site}"}} {n}' for site, n in snap["swallowed"].items())
+    for field in ("hits", "store_hits", "misses", "evictions"):
+        lines.append(f"# TYPE {prefix}_cache_{field}_total counter")
+        lines.extend(f'{prefix}_cache_{field}_total{{cache="{name}"}} {stats[field]}' for name, stats in snap["caches"].items())
+    lines.append(f"# TYPE {prefix}_cache_entries gauge")
+    lines.extend(f'{prefix}_cache_entries{{cache="{name}"}} {stats["size"]}' for name, stats in snap["caches"].items())
+    return "\n".join(lines) + "\n"
+
+def _timed(op: str, fn, *args, **kwargs):
+    """fn 호출 시간을 op 이름으로 기록 (비활성 시 그대로 호출)"""
+    if not _METRICS_ENABLED: return fn(*args, **kwargs)
+    start, ok = time.perf_counter(), False
+    try:
+        result = fn(*args, **kwargs)
+        ok = True
+        return result
+    finally:
+        _METRICS.observe(op, time.perf_counter() - start, ok)
+
+def _count(name: str, n: int = 1):
+    if _METRICS_ENABLED: _METRICS.incr(name, n)
+
+def _swallowed(site: str, default=None):
+    """except 블록에서 호출: 삼킨 예외를 위치별로 집계하고 default를 반환 (예산 초과는 다시 발생시킴)"""
+    error = sys.exc_info()[1]
+    if isinstance(error, DeadlineExceeded): raise error
+    if _METRICS_ENABLED: _METRICS.error(site, error)
+    return default
 
 MENTION_PATTERN = re.compile(r"@(\S+)")
 
+_FETCH_COUNTERS: ContextVar[tuple] = ContextVar("thread_helper_fetch_counters", default=())
+
+_PIPELINE_ENABLED = False
+_EXECUTOR = None
+_EXECUTOR_WORKERS = 8
+_INFLIGHT = None
+_EXECUTOR_LOCK = threading.Lock()
+_WORKER_STATE = threading.local()
+
+def configure_pipeline(enabled: bool = True, max_workers: int = 8, max_inflight: Optional[int] = 8) -> None:
+    """파이프라인 모드 설정
+
+    활성화하면 supplement 복호화, 유저 조회(open_chat_member / friends), 메시지 복호화를
+    공유 스레드 풀에서 동시에 수행합니다. max_inflight는 Iris 서버로 동시에 나가는
+    query / decrypt 호출 수의 상한입니다 (None이면 제한 없음, 비활성화하면 상한도 해제).
+    """
+    global _PIPELINE_ENABLED, _EXECUTOR, _EXECUTOR_WORKERS, _INFLIGHT
+    old_executor = _EXECUTOR
+    if old_executor is not None and max_workers != _EXECUTOR_WORKERS:
+        _EXECUTOR = None
+        old_executor.shutdown(wait=False)
+    _EXECUTOR_WORKERS = max_workers
+    _INFLIGHT = threading.BoundedSemaphore(max_inflight) if enabled and max_inflight else None
+    _PIPELINE_ENABLED = enabled
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(max_workers=_EXECUTOR_WORKERS, thread_name_prefix="thread_helper", initializer=_mark_worker)
+    return _EXECUTOR
+
+def _mark_worker():
+    _WORKER_STATE.in_pool = True
+
+def _pipelined() -> bool:
+    """현재 스레드에서 작업을 풀로 분산할지 여부 (풀 내부에서는 중첩 분산하지 않음)"""
+    return _PIPELINE_ENABLED and not getattr(_WORKER_STATE, "in_pool", False)
+
+def _submit(fn, *args):
+    return _executor().submit(copy_context().run, fn, *args)
+
+def _parallel_map(fn, items: List[Any]) -> List[Any]:
+    if len(items) < 2 or not _pipelined(): return [fn(item) for item in items]
+    return [f.result() for f in [_submit(fn, item) for item in items]]
+
+def _io(op: str, fn, *args):
+    """Iris 서버 호출 (예산 시간 확인, 동시 호출 상한 적용)"""
+    d = _DEADLINE.get()
+    if d is not None: d.check(op)
+    sem = _INFLIGHT
+    if sem is None: return _timed(op, fn, *args)
+    if not sem.acquire(timeout=d.remaining() if d is not None else None): raise d.exceeded(op)
+    try: return _timed(op, fn, *args)
+    finally: sem.release()
+
+def _query(api_wrapper, query: str, bind: Optional[List[Any]] = None) -> List[dict]:
+    """IrisAPI.query 호출 (활성화된 조회 카운터 증가)"""
+    for counter in _FETCH_COUNTERS.get():
+        counter[0] += 1
+    return _io("query", api_wrapper.query, query, bind if bind is not None else [])
+
+@contextmanager
+def _count_fetches():
+    """블록 안에서 발생한 query 호출 수를 [count] 형태로 집계"""
+    counter = [0]
+    token = _FETCH_COUNTERS.set(_FETCH_COUNTERS.get() + (counter,))
+    try: yield counter
+    finally: _FETCH_COUNTERS.reset(token)
+
+class DeadlineExceeded(Exception):
+    """예산 시간(budget_ms)이 지나 Iris 호출을 중단함"""
+
+class Deadline:
+    """deadline() 블록의 만료 시각(time.monotonic 기준)과 초과 사유"""
+    __slots__ = ('expires_at', 'reason')
+
+    def __init__(self, expires_at: Optional[float] = None):
+        self.expires_at = expires_at
+        self.reason = None
+
+    def remaining(self) -> Optional[float]:
+        """남은 시간(초), 만료 시각이 없으면 None"""
+        if self.expires_at is None: return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def partial(self) -> bool:
+        """블록 안에서 예산 초과로 중단된 I/O가 있었는지 여부"""
+        return self.reason is not None
+
+    def exceeded(self, op: str) -> DeadlineExceeded:
+        if self.reason is None:
+            self.reason = f"deadline_exceeded:{op}"
+            _count("deadline_exceeded")
+        return DeadlineExceeded(self.reason)
+
+    def check(self, op: str):
+        if self.expires_at is not None and time.monotonic() >= self.expires_at: raise self.exceeded(op)
+
+_DEADLINE: ContextVar[Optional[Deadline]] = ContextVar("thread_helper_deadline", default=None)
+
+@contextmanager
+def deadline(budget_ms: Optional[float] = None):
+    """블록 안의 모든 query / decrypt / 전송에 적용되는 예산 시간 (중첩 시 더 이른 만료 시각 적용)
+
+    예산이 지나면 이후 Iris 호출은 DeadlineExceeded로 즉시 중단되고, 헬퍼는 그때까지의 결과를 반환합니다.
+    """
+    parent = _DEADLINE.get()
+    expires_at = time.monotonic() + budget_ms / 1000 if budget_ms is not None else None
+    if parent is not None and parent.expires_at is not None and (expires_at is None or parent.expires_at < expires_at):
+        expires_at = parent.expires_at
+    d = Deadline(expires_at)
+    token = _DEADLINE.set(d)
+    try: yield d
+    finally:
+        _DEADLINE.reset(token)
+        if parent is not None and d.reason is not None and parent.reason is None: parent.reason = d.reason
+
+class PartialList(list):
+    """예산 초과로 중간에 끊긴 리스트 결과 (reason에 사유)"""
+    partial = True
+
+    def __init__(self, items=(), reason: Optional[str] = None):
+        super().__init__(items)
+        self.reason = reason
+
+class PartialDict(dict):
+    """예산 초과로 중간에 끊긴 딕셔너리 결과 (reason에 사유)"""
+    partial = True
+
+    def __init__(self, items=(), reason: Optional[str] = None):
+        super().__init__(items)
+        self.reason = reason
+
+def is_partial(result) -> bool:
+    """헬퍼 결과가 예산 초과로 일부만 담겼는지 여부"""
+    return bool(getattr(result, "partial", False))
+
+def _mark_partial(result, reason: Optional[str]):
+    if reason is None or getattr(result, "partial", False): return result
+    if isinstance(result, list): return PartialList(result, reason)
+    if isinstance(result, dict): return PartialDict(result, reason)
+    return result
+
+def _budgeted(empty=None):
+    """헬퍼에 budget_ms 키워드 인자 추가: 예산 안에서 실행하고, 초과하면 그때까지의 결과를 부분 결과로 표시
+
+    결과를 만들기 전에 예산이 끝나면 empty(호출 가능하면 호출 결과)를 반환합니다.
+    리스트·딕셔너리 결과는 PartialList / PartialDict로 표시되고, 그 밖의 결과는 deadline() 블록의 reason으로 확인합니다.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, budget_ms: Optional[float] = None, **kwargs):
+            if budget_ms is None and _DEADLINE.get() is None: return func(*args, **kwargs)
+            with deadline(budget_ms) as d:
+                try: result = func(*args, **kwargs)
+                except DeadlineExceeded: result = empty() if callable(empty) else empty
+            return _mark_partial(result, d.reason)
+        return wrapper
+    return decorator
+
 def _silent_parse(self, res):
     """Iris API 응답 파싱 및 에러 처리"""
     try: data = res.json()
-    except: data = {}
+    except Exception: data = _swallowed("silent_parse", {})
     if not 200 <= res.status_code <= 299:
         raise Exception(f"Iris 오류: {data.get('message', '알 수 없는 오류')}")
     return data
@@ -55,13 +700,35 @@ def _get_user_enc(chat_api_wrapper, user_id: int):
     if not user_id: return None
     cached = _USER_INFO_CACHE.get(user_id)
     if cached: return cached.get("enc")
+    if _USER_MISS_CACHE.get(("member", user_id)): return None
 
     try:
-        result = chat_api_wrapper.query("SELECT enc FROM db2.open_chat_member WHERE user_id = ? LIMIT 1", [user_id])
+        result = _query(chat_api_wrapper, "SELECT enc FROM db2.open_chat_member WHERE user_id = ? LIMIT 1", [user_id])
         if result: return int(result[0].get("enc", 0))
-    except: pass
+        _USER_MISS_CACHE.set(("member", user_id), True)
+    except Exception: _swallowed("get_user_enc")
     return None
 
+_DECRYPT_BACKEND = None
+
+def set_decrypt_backend(backend) -> None:
+    """로컬 복호화 백엔드 설정 (예: kakao_decrypt.LocalDecryptor, None이면 Iris API만 사용)
+
+    백엔드는 decrypt(enc, text, user_id)와 decrypt_many(items)를 제공해야 하며,
+    실패한 항목은 Iris API 복호화로 재시도합니다.
+    """
+    global _DECRYPT_BACKEND
+    _DECRYPT_BACKEND = backend
+
+def _decrypt_remote(api_wrapper, enc: int, text: str, user_id: int):
+    backend = _DECRYPT_BACKEND
+    if backend is not None:
+        try:
+            decrypted = _timed("decrypt_local", backend.decrypt, enc, text, user_id)
+            if decrypted: return decrypted
+        except Exception: _swallowed("decrypt_remote")
+    return _io("decrypt", api_wrapper.decrypt, enc, text, user_id)
+
 def _decrypt_cached(api_wrapper, enc: int, text: str, user_id: int):
     """캐시된 키를 이용한 텍스트 복호화"""
     if not text or not enc: return None
@@ -70,30 +737,137 @@ def _decrypt_cached(api_wrapper, enc: int, text: str, user_id: int):
     cached_result = _DECRYPT_CACHE.get(cache_key)
     if cached_result is not None:
         return cached_result
-
-    try: 
-        decrypted = api_wrapper.decrypt(enc, text, user_id)
-        if decrypted:
-            _DECRYPT_CACHE.set(cache_key, decrypted)
-        return decrypted
-    except: return None
+    if _DECRYPT_MISS_CACHE.get(cache_key): return None
+    return _DECRYPT_FLIGHT.do(cache_key, lambda: _decrypt_and_store(cache_key, _decrypt_remote, api_wrapper))
+
+def _decrypt_and_store(cache_key: tuple, decrypt_fn, api_wrapper) -> Optional[str]:
+    enc, text, user_id = cache_key
+    try: decrypted = decrypt_fn(api_wrapper, enc, text, user_id)
+    except Exception: decrypted = _swallowed("decrypt_and_store")
+    if decrypted: _DECRYPT_CACHE.set(cache_key, decrypted)
+    else: _DECRYPT_MISS_CACHE.set(cache_key, True)
+    return decrypted
+
+def _decrypt_api(api_wrapper, enc: int, text: str, user_id: int):
+    return _io("decrypt", api_wrapper.decrypt, enc, text, user_id)
+
+def _decrypt_many(api_wrapper, items: List[tuple]) -> List[Optional[str]]:
+    """(enc, text, user_id) 묶음 복호화: 캐시 → 로컬 백엔드 일괄 처리 → Iris API 순서"""
+    results = [None] * len(items)
+    pending = []
+    for i, (enc, text, user_id) in enumerate(items):
+        if not text or not enc: continue
+        cached_result = _DECRYPT_CACHE.get((enc, text, user_id))
+        if cached_result is not None: results[i] = cached_result
+        elif not _DECRYPT_MISS_CACHE.get((enc, text, user_id)): pending.append(i)
+
+    backend = _DECRYPT_BACKEND
+    if pending and backend is not None:
+        try:
+            decoded = _timed("decrypt_local_batch", backend.decrypt_many, [items[i] for i in pending])
+            for i, decrypted in zip(pending, decoded):
+                if decrypted:
+                    results[i] = decrypted
+                    _DECRYPT_CACHE.set(items[i], decrypted)
+        except Exception: _swallowed("decrypt_many.backend")
+
+    def _remote(i):
+        key = tuple(items[i])
+        try: return _DECRYPT_FLIGHT.do(key, lambda: _decrypt_and_store(key, _decrypt_api, api_wrapper))
+        except Exception: return _swallowed("decrypt_many.remote")
+
+    remaining = [i for i in pending if results[i] is None]
+    for i, decrypted in zip(remaining, _parallel_map(_remote, remaining)):
+        results[i] = decrypted
+    return results
 
 def _decrypt_supplement(chat: ChatContext, supplement: str, user_id: int):
     """supplement 복호화 및 파싱"""
     if not supplement: return None
     if supplement.startswith("{"):
         try: return json.loads(supplement)
-        except: return None
+        except Exception: return _swallowed("decrypt_supplement.json")
     
     enc = _get_user_enc(chat.api, user_id)
     if not enc: return None
     try:
         plain_text = _decrypt_cached(chat.api, enc, supplement, user_id)
         if plain_text: return json.loads(plain_text)
-    except: pass
+    except Exception: _swallowed("decrypt_supplement")
     return None
 
-def _fetch_users_batch(api_wrapper, user_ids: Set[int]) -> Dict[int, Dict[str, Any]]:
+def _decode_supplements(chat: ChatContext, records: List[dict]) -> List[Optional[dict]]:
+    """레코드 묶음의 supplement를 파싱 (암호화된 항목은 일괄 복호화)"""
+    decoded = [None] * len(records)
+    encrypted = []
+    for i, record in enumerate(records):
+        supplement = record.get("supplement") or ""
+        if not supplement: continue
+        if supplement.startswith("{"):
+            try: decoded[i] = json.loads(supplement)
+            except Exception: _swallowed("decode_supplements.json")
+        else:
+            encrypted.append(i)
+    if not encrypted: return decoded
+
+    users = _fetch_users_batch(chat.api, {int(records[i].get("user_id") or 0) for i in encrypted} - {0})
+    items, targets = [], []
+    for i in encrypted:
+        uid = int(records[i].get("user_id") or 0)
+        enc = (users.get(uid) or {}).get("enc")
+        if enc:
+            items.append((int(enc), records[i]["supplement"], uid))
+            targets.append(i)
+    for i, plain_text in zip(targets, _decrypt_many(chat.api, items)):
+        if plain_text:
+            try: decoded[i] = json.loads(plain_text)
+            except Exception: _swallowed("decode_supplements.decrypted_json")
+    return decoded
+
+def _is_encrypted_name(name: str) -> bool:
+    return not any(c in name for c in ['가', '나', '다', ' '])
+
+def _prefetch_texts(chat: ChatContext, records: List[dict], user_cache: Dict[int, Any]):
+    """레코드 묶음의 메시지·닉네임을 일괄 복호화하여 복호화 캐시를 채움"""
+    items = []
+    for record in records:
+        user_id = int(record.get("user_id") or 0)
+        info = user_cache.get(user_id) or {}
+        enc, raw_name = info.get("enc"), info.get("name")
+        if not enc: continue
+        if raw_name and _is_encrypted_name(raw_name):
+            items.append((int(enc), raw_name, user_id))
+        message_text = record.get("message", "")
+        if message_text and not message_text.startswith("{"):
+            items.append((int(enc), message_text, user_id))
+    if items: _decrypt_many(chat.api, list(dict.fromkeys(items)))
+
+_PREFETCH_CHUNK = 4
+
+def _prepare_records(chat: ChatContext, records: List[dict], user_ids: Optional[Set[int]] = None) -> Dict[int, Dict[str, Any]]:
+    """레코드 묶음의 발신자 조회와 메시지·닉네임 복호화를 수행하고 유저 정보 맵을 반환
+
+    파이프라인 모드에서는 유저 정보가 도착하는 대로 해당 발신자의 메시지 복호화를 시작하여
+    유저 조회와 복호화가 겹쳐 실행됩니다.
+    """
+    if user_ids is None: user_ids = {int(r.get("user_id") or 0) for r in records} - {0}
+    if not _pipelined():
+        user_cache = _fetch_users_batch(chat.api, user_ids)
+        _prefetch_texts(chat, records, user_cache)
+        return user_cache
+
+    futures = []
+    def _on_users(users):
+        batch = [r for r in records if int(r.get("user_id") or 0) in users]
+        for i in range(0, len(batch), _PREFETCH_CHUNK):
+            futures.append(_submit(_prefetch_texts, chat, batch[i:i + _PREFETCH_CHUNK], users))
+
+    user_cache = _fetch_users_batch(chat.api, user_ids, on_users=_on_users)
+    _wait_futures(list(futures))
+    return user_cache
+
+def _fetch_users_batch(api_wrapper, user_ids: Set[int], on_users=None) -> Dict[int, Dict[str, Any]]:
+    """유저 정보 일괄 조회 (on_users가 있으면 결과가 도착하는 대로 부분 결과를 전달)"""
     if not user_ids: return {}
     
     result_map = {}
@@ -103,49 +877,245 @@ def _fetch_users_batch(api_wrapper, user_ids: Set[int]) -> Dict[int, Dict[str, A
         cached_data = _USER_INFO_CACHE.get(uid)
         if cached_data:
             result_map[uid] = cached_data
-        else:
+        elif not _USER_MISS_CACHE.get(uid):
             missing_ids.append(uid)
     
+    if on_users and result_map: on_users(dict(result_map))
     if not missing_ids: return result_map
 
+    reported = set()
+    def _report(users):
+        reported.update(users)
+        if on_users: on_users(users)
+
     try:
-        placeholders = ', '.join(['?'] * len(missing_ids))
-        query_chat = f"SELECT user_id, nickname, enc FROM db2.open_chat_member WHERE user_id IN ({placeholders})"
-        result_chat = api_wrapper.query(query_chat, missing_ids)
+        fetched = _USER_FLIGHT.do_many(missing_ids, lambda ids: _query_users(api_wrapper, ids, _report))
+        result_map.update(fetched)
+        late = {uid: data for uid, data in fetched.items() if uid not in reported}
+        if on_users and late: on_users(late)
+    except Exception: _swallowed("fetch_users_batch")
+    return result_map
+
+def _query_users(api_wrapper, missing_ids: List[int], on_users=None) -> Dict[int, Dict[str, Any]]:
+    """open_chat_member → friends 순으로 유저 정보를 조회하고 캐시에 반영"""
+    if _pipelined():
+        return _query_users_parallel(api_wrapper, missing_ids, on_users)
+    result_map = {}
+    result_chat = []
+    for chunk in _chunks(missing_ids):
+        placeholders = ', '.join(['?'] * len(chunk))
+        result_chat.extend(_query(api_wrapper, f"SELECT user_id, nickname, enc FROM db2.open_chat_member WHERE user_id IN ({placeholders})", chunk))
+    
+    found_ids = set()
+    for r in result_chat:
+        uid = int(r.get("user_id"))
+        name = r.get("nickname")
+        if name: name = sys.intern(name)
+        
+        data = {"name": name, "enc": int(r.get("enc", 0))}
+        result_map[uid] = data
+        _USER_INFO_CACHE.set(uid, data)
+        found_ids.add(uid)
+    if on_users and result_map: on_users(dict(result_map))
+        
+    still_missing = [uid for uid in missing_ids if uid not in found_ids]
+    if still_missing:
+        result_friends = []
+        for chunk in _chunks(still_missing):
+            placeholders = ', '.join(['?'] * len(chunk))
+            result_friends.extend(_query(api_wrapper, f"SELECT id, name, enc FROM db2.friends WHERE id IN ({placeholders})", chunk))
         
-        found_ids = set()
-        for r in result_chat:
-            uid = int(r.get("user_id"))
-            name = r.get("nickname")
+        for r in result_friends:
+            uid = int(r.get("id"))
+            name = r.get("name")
             if name: name = sys.intern(name)
             
             data = {"name": name, "enc": int(r.get("enc", 0))}
             result_map[uid] = data
             _USER_INFO_CACHE.set(uid, data)
-            found_ids.add(uid)
-            
-        still_missing = [uid for uid in missing_ids if uid not in found_ids]
-        if still_missing:
-            placeholders_missing = ', '.join(['?'] * len(still_missing))
-            query_friends = f"SELECT id, name, enc FROM db2.friends WHERE id IN ({placeholders_missing})"
-            result_friends = api_wrapper.query(query_friends, still_missing)
-            
-            for r in result_friends:
-                uid = int(r.get("id"))
-                name = r.get("name")
-                if name: name = sys.intern(name)
-                
-                data = {"name": name, "enc": int(r.get("enc", 0))}
-                result_map[uid] = data
-                _USER_INFO_CACHE.set(uid, data)
-                
-    except: pass
+
+        for uid in still_missing:
+            if uid not in result_map: _USER_MISS_CACHE.set(uid, True)
+        friends_map = {uid: result_map[uid] for uid in still_missing if uid in result_map}
+        if on_users and friends_map: on_users(friends_map)
+
     return result_map
 
+def _user_rows(rows: List[dict], id_key: str, name_key: str) -> Dict[int, Dict[str, Any]]:
+    users = {}
+    for r in rows:
+        name = r.get(name_key)
+        if name: name = sys.intern(name)
+        users[int(r.get(id_key))] = {"name": name, "enc": int(r.get("enc", 0))}
+    return users
+
+def _query_users_parallel(api_wrapper, missing_ids: List[int], on_users=None) -> Dict[int, Dict[str, Any]]:
+    """open_chat_member와 friends를 동시에 조회 (open_chat_member 결과 우선)"""
+    member_futures, friends_futures = [], []
+    for chunk in _chunks(missing_ids):
+        placeholders = ', '.join(['?'] * len(chunk))
+        member_futures.append(_submit(_query, api_wrapper, f"SELECT user_id, nickname, enc FROM db2.open_chat_member WHERE user_id IN ({placeholders})", chunk))
+        friends_futures.append(_submit(_query, api_wrapper, f"SELECT id, name, enc FROM db2.friends WHERE id IN ({placeholders})", chunk))
+
+    members = _user_rows([r for f in member_futures for r in f.result()], "user_id", "nickname")
+    for uid, data in members.items():
+        _USER_INFO_CACHE.set(uid, data)
+    if on_users and members: on_users(dict(members))
+
+    friends = {uid: data for uid, data in _user_rows([r for f in friends_futures for r in f.result()], "id", "name").items() if uid not in members}
+    for uid, data in friends.items():
+        _USER_INFO_CACHE.set(uid, data)
+    if on_users and friends: on_users(dict(friends))
+
+    result_map = {**friends, **members}
+    for uid in missing_ids:
+        if uid not in result_map: _USER_MISS_CACHE.set(uid, True)
+    return result_map
+
+def _warm_users(api_wrapper, users: Dict[int, Dict[str, Any]]) -> None:
+    """유저 정보를 캐시에 넣고 암호화된 닉네임을 일괄 복호화하여 복호화 캐시를 채움"""
+    for uid, data in users.items():
+        _USER_INFO_CACHE.set(uid, data)
+        _USER_MISS_CACHE.delete(uid)
+    items = [(data["enc"], data["name"], uid) for uid, data in users.items()
+             if data.get("enc") and data.get("name") and _is_encrypted_name(data["name"])]
+    if items: _decrypt_many(api_wrapper, items)
+
+def _room_members(api_wrapper, room_id: int) -> tuple:
+    """chat_rooms의 (link_id, members 유저 ID 목록)"""
+    rows = _query(api_wrapper, "SELECT link_id, members FROM chat_rooms WHERE id = ?", [room_id])
+    if not rows: return None, []
+    link_id, members = rows[0].get("link_id"), []
+    try: members = [int(uid) for uid in json.loads(rows[0].get("members") or "[]")]
+    except Exception: _swallowed("room_members")
+    return (int(link_id) if link_id else None), members
+
+def _prewarm_room(api_wrapper, room_id: int, page_size: int = 500, limit: Optional[int] = None) -> int:
+    """방 참여자를 최대 limit명(기본: 유저 캐시 용량)까지 적재"""
+    room_id = int(room_id)
+    page_size = max(1, int(page_size))
+    if limit is None: limit = _USER_INFO_CACHE.max_size
+    link_id, members = _room_members(api_wrapper, room_id)
+    warmed = set()
+    if link_id:
+        # 오픈채팅 멤버를 user_id 키셋 페이지로 적재
+        last_id = -(2 ** 63)
+        while len(warmed) < limit:
+            size = min(page_size, limit - len(warmed))
+            rows = _query(api_wrapper, "SELECT user_id, nickname, enc FROM db2.open_chat_member WHERE link_id = ? AND user_id > ? "
+                                       "ORDER BY user_id ASC LIMIT ?", [link_id, last_id, size])
+            if not rows: break
+            users = _user_rows(rows, "user_id", "nickname")
+            _warm_users(api_wrapper, users)
+            warmed.update(users)
+            if len(rows) < size: break
+            last_id = int(rows[-1]["user_id"])
+
+    # 오픈채팅 멤버 테이블에 없는 참여자(일반 채팅방, 친구)는 청크 단위 IN 조회
+    rest = [uid for uid in dict.fromkeys(members) if uid not in warmed][:max(0, limit - len(warmed))]
+    for chunk in _chunks(rest, min(page_size, _MAX_BIND_VARS)):
+        users = _fetch_users_batch(api_wrapper, set(chunk))
+        _warm_users(api_wrapper, users)
+        warmed.update(users)
+    return len(warmed)
+
+def _active_room_ids(api_wrapper, recent: int = 2000) -> List[int]:
+    """최근 recent개 메시지가 있는 방 ID (최근 활동 순)"""
+    rows = _query(api_wrapper, "SELECT chat_id, MAX(id) AS last_id FROM (SELECT chat_id, id FROM chat_logs ORDER BY id DESC LIMIT ?) "
+                               "GROUP BY chat_id ORDER BY last_id DESC", [recent])
+    return [int(r["chat_id"]) for r in rows if r.get("chat_id")]
+
+@_budgeted(0)
+def prewarm_room(chat: ChatContext, page_size: int = 500) -> int:
+    """방 참여자 정보와 닉네임 복호화 결과를 캐시에 미리 적재하고 적재한 유저 수를 반환"""
+    try: return _prewarm_room(chat.api, chat.room.id, page_size)
+    except Exception: return _swallowed("prewarm_room", 0)
+
+def prewarm_rooms(api_wrapper, room_ids: Optional[List[int]] = None, page_size: int = 500, recent: int = 2000) -> Dict[int, int]:
+    """여러 방을 미리 적재 (room_ids가 없으면 최근 recent개 메시지가 있는 활성 방) -> {방 ID: 유저 수}
+
+    적재한 유저가 서로를 캐시에서 밀어내지 않도록 모든 방을 합쳐 유저 캐시 용량까지만 적재하며,
+    앞쪽 방(활성 방은 최근 활동 순)부터 채우고 용량이 찬 뒤의 방은 결과에서 빠집니다.
+    """
+    if room_ids is None:
+        try: room_ids = _active_room_ids(api_wrapper, recent)
+        except Exception: room_ids = _swallowed("prewarm_rooms.active", [])
+    result, capacity = {}, _USER_INFO_CACHE.max_size
+    for room_id in room_ids:
+        if capacity <= 0: break
+        try: result[int(room_id)] = _prewarm_room(api_wrapper, room_id, page_size, capacity)
+        except Exception: result[int(room_id)] = _swallowed("prewarm_rooms", 0)
+        capacity -= result[int(room_id)]
+    return result
+
+class RoomPrewarmer:
+    """백그라운드 스레드에서 시작 직후와 interval초마다 prewarm_rooms 실행
+
+    interval은 유저 캐시 TTL(기본 300초)보다 짧아야 캐시가 만료되기 전에 다시 채워집니다.
+    """
+    def __init__(self, api_wrapper, room_ids: Optional[List[int]] = None, interval: float = 240,
+                 page_size: int = 500, recent: int = 2000):
+        self.api = api_wrapper
+        self.room_ids = room_ids
+        self.interval = interval
+        self.page_size = page_size
+        self.recent = recent
+        self.runs = 0
+        self.last_result = {}
+        self.last_run_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> Dict[int, int]:
+        self.last_result = prewarm_rooms(self.api, self.room_ids, self.page_size, self.recent)
+        self.last_run_at = time.time()
+        self.runs += 1
+        return self.last_result
+
+    def _run(self):
+        while not self._stop.is_set():
+            try: self.run_once()
+            except Exception: _swallowed("RoomPrewarmer.run")
+            if not self.interval or self._stop.wait(self.interval): return
+
+    def start(self) -> "RoomPrewarmer":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="RoomPrewarmer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True, timeout: Optional[float] = None):
+        self._stop.set()
+        if wait and self._thread is not None: self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": self.running, "runs": self.runs, "rooms": len(self.last_result),
+                "users": sum(self.last_result.values()), "last_run_at": self.last_run_at}
+
+_PREWARMER = None
+
+def start_prewarm(api_wrapper, room_ids: Optional[List[int]] = None, interval: float = 240, **kwargs) -> RoomPrewarmer:
+    """공유 RoomPrewarmer 시작 (이미 실행 중이면 중지 후 새 설정으로 교체, interval=0이면 한 번만 실행)"""
+    global _PREWARMER
+    if _PREWARMER is not None: _PREWARMER.stop(wait=False)
+    _PREWARMER = RoomPrewarmer(api_wrapper, room_ids, interval, **kwargs).start()
+    return _PREWARMER
+
+def stop_prewarm(wait: bool = True) -> None:
+    global _PREWARMER
+    if _PREWARMER is not None: _PREWARMER.stop(wait)
+    _PREWARMER = None
+
 def _get_user_name_cached(api_wrapper, user_id: int):
     """DB에서 유저 닉네임과 암호화 키 정보 조회"""
     cached = _USER_INFO_CACHE.get(user_id)
     if cached: return cached
+    if _USER_MISS_CACHE.get(user_id): return None
 
     try:
         query = """
@@ -157,12 +1127,13 @@ def _get_user_name_cached(api_wrapper, user_id: int):
             LEFT JOIN db2.open_chat_member ON open_chat_member.user_id = info.user_id 
             LEFT JOIN db2.friends ON friends.id = info.user_id
         """
-        result = api_wrapper.query(query, [user_id])
-        if result and result[0]:
+        result = _query(api_wrapper, query, [user_id])
+        if result and result[0] and (result[0].get("name") is not None or result[0].get("enc") is not None):
             data = {"name": result[0].get("name"), "enc": result[0].get("enc")}
             _USER_INFO_CACHE.set(user_id, data)
             return data
-    except: pass
+        _USER_MISS_CACHE.set(user_id, True)
+    except Exception: _swallowed("get_user_name_cached")
     return None
 
 def _get_user_name(chat: ChatContext, user_id: int):
@@ -172,37 +1143,46 @@ def _get_user_name(chat: ChatContext, user_id: int):
         if not info: return None
         name, enc = info.get("name"), info.get("enc")
         if not name: return None
-        if enc and name and not any(c in name for c in ['가', '나', '다', ' ']):
+        if enc and name and _is_encrypted_name(name):
             try:
                 decrypted = _decrypt_cached(chat.api, int(enc), name, user_id)
                 if decrypted: return decrypted
-            except: pass
+            except Exception: _swallowed("get_user_name.decrypt")
         return name
-    except: return None
+    except Exception: return _swallowed("get_user_name")
 
-def _make_chat_from_record(chat: ChatContext, record: dict, user_cache: Dict[int, Any] = None):
-    """DB 레코드를 ChatContext 객체로 변환"""
+def _make_chat_from_record(chat: ChatContext, record: dict, user_cache: Dict[int, Any] = None, plain: Optional[Dict[tuple, Optional[str]]] = None):
+    """DB 레코드를 ChatContext 객체로 변환 (plain을 주면 그 복호화 결과만 쓰고 조회·복호화 I/O를 하지 않음)"""
+    return _timed("make_chat", _chat_from_record, chat, record, user_cache, plain)
+
+def _decrypt_for_record(chat: ChatContext, plain: Optional[Dict[tuple, Optional[str]]], enc, text: str, user_id: int) -> Optional[str]:
+    if plain is None: return _decrypt_cached(chat.api, int(enc), text, user_id)
+    return plain.get((int(enc), text, user_id))
+
+def _chat_from_record(chat: ChatContext, record: dict, user_cache: Optional[Dict[int, Any]], plain: Optional[Dict[tuple, Optional[str]]] = None):
     try:
         v = {}
         try: v = json.loads(record.get("v", "{}"))
-        except: pass
+        except Exception: _swallowed("make_chat.v")
         room = Room(id=int(record["chat_id"]), name=chat.room.name, api=chat.api)
         user_id = int(record["user_id"])
         
         user_info = user_cache.get(user_id) if user_cache else None
         
-        if not user_info:
+        if not user_info and plain is None:
             user_info = _USER_INFO_CACHE.get(user_id)
 
         if user_info:
             raw_name = user_info.get("name")
             enc = user_info.get("enc")
             sender_name = raw_name
-            if enc and raw_name and not any(c in raw_name for c in ['가', '나', '다', ' ']):
+            if enc and raw_name and _is_encrypted_name(raw_name):
                 try:
-                    decrypted = _decrypt_cached(chat.api, int(enc), raw_name, user_id)
+                    decrypted = _decrypt_for_record(chat, plain, enc, raw_name, user_id)
                     if decrypted: sender_name = decrypted
-                except: pass
+                except Exception: _swallowed("make_chat.name")
+        elif plain is not None:
+            sender_name, enc = None, None
         else:
             sender_name = _get_user_name(chat, user_id)
             enc = _get_user_enc(chat.api, user_id)
@@ -213,13 +1193,441 @@ def _make_chat_from_record(chat: ChatContext, record: dict, user_cache: Dict[int
         if enc:
             if message_text and not message_text.startswith("{"):
                 try:
-                    decrypted = _decrypt_cached(chat.api, enc, message_text, user_id)
+                    decrypted = _decrypt_for_record(chat, plain, enc, message_text, user_id)
                     if decrypted: message_text = decrypted
-                except: pass
+                except Exception: _swallowed("make_chat.message")
         message = Message(id=int(record["id"]), type=int(record["type"]), msg=message_text, attachment=attachment, v=v)
         return ChatContext(room=room, sender=sender, message=message, raw=record, api=chat.api, _bot_id=chat._bot_id)
-    except: return None
-
+    except Exception: return _swallowed("make_chat")
+
+_MAX_BIND_VARS = 500
+
+# 헬퍼가 실제로 읽는 chat_logs 컬럼 (플래너 모드에서 SELECT * 대신 사용)
+_RECORD_COLUMNS = ("id", "chat_id", "user_id", "type", "message", "attachment", "v", "created_at", "supplement")
+
+# 평문 supplement 판별과 threadId 추출 (암호문에는 json_extract를 호출하지 않음)
+_SQL_PLAIN = "(supplement LIKE '{%' AND json_valid(supplement))"
+_SQL_THREAD_ID = f"CASE WHEN {_SQL_PLAIN} THEN CAST(json_extract(supplement, '$.threadId') AS INTEGER) END"
+
+# 레코드와 함께 발신자 닉네임·enc를 받는 조인 (open_chat_member 우선, 없으면 friends)
+# 닉네임과 enc가 항상 같은 행에서 오도록 rowid로 한 행만 고르며, 방의 link_id와 같은 멤버 행을 우선함
+_SQL_SENDER_JOIN = ("LEFT JOIN chat_rooms r ON r.id = c.chat_id "
+                    "LEFT JOIN db2.open_chat_member m ON m.rowid = COALESCE("
+                    "(SELECT MIN(rowid) FROM db2.open_chat_member WHERE user_id = c.user_id AND link_id = r.link_id), "
+                    "(SELECT MIN(rowid) FROM db2.open_chat_member WHERE user_id = c.user_id)) "
+                    "LEFT JOIN db2.friends f ON f.rowid = (SELECT MIN(rowid) FROM db2.friends WHERE id = c.user_id)")
+_SQL_SENDER_COLUMNS = "m.nickname AS _member_name, m.enc AS _member_enc, f.name AS _friend_name, f.enc AS _friend_enc"
+
+_PLANNER_ENABLED = False
+_PLANNER_COLUMNS = False
+_JOINED_SENDERS = True
+_JOINED_FAILURE_LIMIT = 3
+_JOINED_RETRY_INTERVAL = 300.0
+_JOINED_FAILURES = 0
+_JOINED_RETRY_AT: Optional[float] = None
+
+def configure_planner(enabled: bool = True, narrow_columns: bool = True) -> None:
+    """쿼리 플래너 모드 설정
+
+    활성화하면 평문 supplement의 threadId를 SQLite의 json_extract로 걸러내고,
+    암호화된 supplement만 복호화 경로로 보냅니다. 서버의 SQLite가 JSON 함수를 지원하지 않으면
+    첫 오류에서 자동으로 기존 방식으로 돌아갑니다.
+    narrow_columns=True이면 SELECT * 대신 헬퍼가 읽는 컬럼만 조회하므로 chat.raw에도 그 컬럼만 남습니다.
+    """
+    global _PLANNER_ENABLED, _PLANNER_COLUMNS
+    _PLANNER_ENABLED = enabled
+    _PLANNER_COLUMNS = enabled and narrow_columns
+
+def _record_columns() -> str:
+    return ", ".join(_RECORD_COLUMNS) if _PLANNER_COLUMNS else "*"
+
+def _is_json_error(e: Exception) -> bool:
+    return "json" in str(e).lower()
+
+def _planner_fallback():
+    """JSON 함수를 쓸 수 없는 서버: SQL 필터를 끄고 Python 필터로 전환"""
+    global _PLANNER_ENABLED
+    _PLANNER_ENABLED = False
+    _swallowed("planner.json")
+
+def configure_joined_lookup(enabled: bool = True) -> None:
+    """원본·답장 레코드를 ID로 조회할 때 발신자 정보를 같은 쿼리로 받을지 설정 (기본 활성화)
+
+    활성화하면 chat_logs 조회 한 번으로 닉네임·enc까지 받아 유저 캐시를 채우므로,
+    이어지는 open_chat_member / friends 조회가 생략됩니다.
+    """
+    global _JOINED_SENDERS, _JOINED_FAILURES, _JOINED_RETRY_AT
+    _JOINED_SENDERS = enabled
+    _JOINED_FAILURES, _JOINED_RETRY_AT = 0, None
+
+def _records_sql(where: str, joined: bool) -> str:
+    sql = f"SELECT {_record_columns()} FROM chat_logs WHERE {where}"
+    if not joined: return sql
+    return f"SELECT c.*, {_SQL_SENDER_COLUMNS} FROM ({sql}) AS c {_SQL_SENDER_JOIN}"
+
+def _joined_enabled() -> bool:
+    """조인 조회를 시도할지 여부 (연속 실패로 쉬는 중이면 재시도 시각까지 기존 조회)"""
+    if not _JOINED_SENDERS: return False
+    return _JOINED_RETRY_AT is None or time.monotonic() >= _JOINED_RETRY_AT
+
+def _is_schema_error(e: Exception) -> bool:
+    message = str(e).lower()
+    return "no such table" in message or "no such column" in message
+
+def _joined_failed(error: Exception):
+    """조인 조회는 실패하고 기존 조회는 성공: 스키마 오류면 조인 조회를 끄고, 일시적 오류는 연속 실패가 한도에 닿을 때만 잠시 끔"""
+    global _JOINED_FAILURES, _JOINED_RETRY_AT
+    _JOINED_FAILURES += 1
+    if _is_schema_error(error): _JOINED_RETRY_AT = float("inf")
+    elif _JOINED_FAILURES >= _JOINED_FAILURE_LIMIT: _JOINED_RETRY_AT = time.monotonic() + _JOINED_RETRY_INTERVAL
+
+def _joined_succeeded():
+    """조인 조회 성공: 연속 실패 횟수를 초기화하고 쉬고 있었다면 다시 켬"""
+    global _JOINED_FAILURES, _JOINED_RETRY_AT
+    if _JOINED_FAILURES or _JOINED_RETRY_AT is not None: _JOINED_FAILURES, _JOINED_RETRY_AT = 0, None
+
+def _seed_senders(records: List[dict]) -> Dict[int, Dict[str, Any]]:
+    """조인 컬럼을 레코드에서 떼어 내 유저 캐시에 반영 (chat.raw에는 chat_logs 컬럼만 남음)"""
+    users = {}
+    for record in records:
+        if "_member_name" not in record: continue
+        member_name, member_enc = record.pop("_member_name"), record.pop("_member_enc", None)
+        friend_name, friend_enc = record.pop("_friend_name", None), record.pop("_friend_enc", None)
+        uid = int(record.get("user_id") or 0)
+        if not uid or uid in users: continue
+        if member_name is not None or member_enc is not None: name, enc = member_name, member_enc
+        elif friend_name is not None or friend_enc is not None: name, enc = friend_name, friend_enc
+        else:
+            _USER_MISS_CACHE.set(uid, True)
+            _USER_MISS_CACHE.set(("member", uid), True)
+            continue
+        users[uid] = {"name": sys.intern(name) if name else name, "enc": int(enc or 0)}
+        _USER_INFO_CACHE.set(uid, users[uid])
+    return users
+
+def _query_records(api_wrapper, where: str, bind: List[Any]) -> List[dict]:
+    """chat_logs 레코드 조회 (조인 모드면 발신자 정보도 같은 쿼리로 받아 유저 캐시에 반영)
+
+    조인 쿼리가 실패하면 기존 쿼리로 다시 조회하고, 그것이 성공하면 실패를 _joined_failed()에 기록합니다.
+    """
+    if not _joined_enabled(): return _query(api_wrapper, _records_sql(where, False), bind)
+    try:
+        records = _query(api_wrapper, _records_sql(where, True), bind)
+        _joined_succeeded()
+        _seed_senders(records)
+        return records
+    except DeadlineExceeded: raise
+    except Exception as e:
+        error = e
+        _swallowed("query_records.joined")
+    records = _query(api_wrapper, _records_sql(where, False), bind)
+    _joined_failed(error)
+    return records
+
+def _query_planned(api_wrapper, build) -> tuple:
+    """build(planned) -> (sql, bind) 실행 후 (rows, planned) 반환 (JSON 함수 오류 시 기존 쿼리로 재시도)"""
+    planned = _PLANNER_ENABLED
+    try: return _query(api_wrapper, *build(planned)), planned
+    except Exception as e:
+        if not planned or not _is_json_error(e): raise
+        _planner_fallback()
+    return _query(api_wrapper, *build(False)), False
+
+def _chunks(items: List[Any], size: int = _MAX_BIND_VARS):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _fetch_records(api_wrapper, message_ids: List[int]) -> List[dict]:
+    """ID 목록에 해당하는 chat_logs 레코드를 ID 오름차순으로 조회 (발신자 정보는 유저 캐시에 반영)"""
+    records = []
+    for chunk in _chunks(list(message_ids)):
+        placeholders = ', '.join(['?'] * len(chunk))
+        records.extend(_query_records(api_wrapper, f"id IN ({placeholders})", chunk))
+    records.sort(key=lambda r: int(r["id"]))
+    return records
+
+class _RoomIndex:
+    __slots__ = ('low', 'high', 'live', 'checked_at', 'used_at', 'threads', 'overflow', 'size', 'generation', 'lock', 'scan_lock')
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.scan_lock = threading.Lock()
+        self.generation = 0
+        self.used_at = time.monotonic()
+        self.reset()
+
+    def reset(self):
+        """커버리지와 답장 목록을 비움 (진행 중인 스캔 결과는 generation으로 걸러냄)"""
+        self.low = None
+        self.high = None
+        self.live = False
+        self.checked_at = 0.0
+        self.threads = {}
+        self.overflow = set()
+        self.size = 0
+        self.generation += 1
+
+class ThreadIndex:
+    """방별 스레드 답장 인덱스 (threadId -> 정렬된 답장 ID / 발신자 ID)
+
+    방마다 (low, high] 구간을 한 번 백필 스캔한 뒤에는 track_thread_message()로 들어오는
+    message 이벤트만 반영하므로, 조회 비용은 스레드 크기에 비례하고 supplement 복호화가 필요 없습니다.
+    이벤트를 놓친 답장도 reconcile_interval초마다 high 이후 구간을 다시 스캔하여 반영하며,
+    방은 max_rooms개 / room_ttl초 LRU로, 방의 답장은 max_room_replies개까지만 유지합니다.
+    답장이 max_thread_replies개를 넘는 스레드는 인덱스에 두지 않고 조회할 때마다 스캔합니다.
+    """
+    def __init__(self, page_size: int = 500, max_rooms: int = 200, room_ttl: float = 3600,
+                 max_room_replies: int = 200_000, max_thread_replies: int = 20_000, reconcile_interval: float = 30):
+        self.page_size = page_size
+        self.max_rooms = max_rooms
+        self.room_ttl = room_ttl
+        self.max_room_replies = max_room_replies
+        self.max_thread_replies = max_thread_replies
+        self.reconcile_interval = reconcile_interval
+        self._rooms = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _room(self, room_id: int, create: bool = True) -> Optional[_RoomIndex]:
+        now = time.monotonic()
+        with self._lock:
+            while self._rooms:
+                oldest = next(iter(self._rooms.values()))
+                if now - oldest.used_at <= self.room_ttl: break
+                self._rooms.popitem(last=False)
+            room = self._rooms.get(room_id)
+            if room is None:
+                if not create: return None
+                room = self._rooms[room_id] = _RoomIndex()
+                while len(self._rooms) > self.max_rooms: self._rooms.popitem(last=False)
+            else:
+                self._rooms.move_to_end(room_id)
+            room.used_at = now
+            return room
+
+    def _insert(self, room: _RoomIndex, thread_id: int, message_id: int, user_id: int):
+        # room.lock을 잡은 상태에서 호출
+        if thread_id in room.overflow: return
+        ids, senders = room.threads.setdefault(thread_id, ([], []))
+        if ids and message_id > ids[-1]:
+            ids.append(message_id)
+            senders.append(user_id)
+        else:
+            pos = bisect.bisect_left(ids, message_id)
+            if pos < len(ids) and ids[pos] == message_id: return
+            ids.insert(pos, message_id)
+            senders.insert(pos, user_id)
+        room.size += 1
+        if len(ids) > self.max_thread_replies:
+            del room.threads[thread_id]
+            room.overflow.add(thread_id)
+            room.size -= len(ids)
+            _count("index_overflow")
+        elif room.size > self.max_room_replies:
+            room.reset()
+            _count("index_reset")
+
+    def add(self, room_id: int, thread_id: int, message_id: int, user_id: int):
+        """답장 하나를 인덱스에 반영 (중복 무시, ID 순서 유지, 아직 백필하지 않은 방은 무시)"""
+        room = self._room(int(room_id), create=False)
+        if room is None: return
+        with room.lock:
+            if room.low is None: return
+            self._insert(room, int(thread_id), int(message_id), int(user_id))
+
+    def observe(self, room_id: int, message_id: int):
+        """실시간 이벤트가 들어오고 있음을 표시 (reconcile_interval 동안 꼬리 스캔 생략)"""
+        room = self._room(int(room_id), create=False)
+        if room is None: return
+        with room.lock:
+            if room.low is not None: room.live = True
+
+    def _page_query(self, room_id: int, last_id: int, upto: Optional[int], planned: bool = False):
+        if planned:
+            # 평문 supplement는 threadId만, 암호문은 supplement 그대로 받아 복호화 경로로 보냄
+            bounds = "AND id <= ? " if upto is not None else ""
+            bind = [room_id, last_id] + ([upto] if upto is not None else []) + [self.page_size]
+            return (f"SELECT id, user_id, CASE WHEN {_SQL_PLAIN} THEN NULL ELSE supplement END AS supplement, {_SQL_THREAD_ID} AS _tid "
+                    f"FROM chat_logs WHERE chat_id = ? AND id > ? {bounds}AND supplement IS NOT NULL "
+                    f"AND ({_SQL_THREAD_ID} IS NOT NULL OR NOT {_SQL_PLAIN}) ORDER BY id ASC LIMIT ?"), bind
+        if upto is None:
+            return "SELECT id, user_id, supplement FROM chat_logs WHERE chat_id = ? AND id > ? AND supplement IS NOT NULL ORDER BY id ASC LIMIT ?", [room_id, last_id, self.page_size]
+        return "SELECT id, user_id, supplement FROM chat_logs WHERE chat_id = ? AND id > ? AND id <= ? AND supplement IS NOT NULL ORDER BY id ASC LIMIT ?", [room_id, last_id, upto, self.page_size]
+
+    def _apply_page(self, room: _RoomIndex, generation: int, after: int, upto: Optional[int], rows: List[dict],
+                    decoded: List[Optional[dict]], last_id: int) -> int:
+        """(after, upto] 구간 스캔의 한 페이지를 반영하고 커버리지를 늘림 (스캔 도중 방이 초기화됐으면 버림)
+
+        페이지마다 커버리지를 기록하므로 순회를 일찍 멈추거나 예산이 끝나도 그때까지의 스캔은 남습니다.
+        """
+        with room.lock:
+            for record, data in zip(rows, decoded):
+                last_id = int(record["id"])
+                if room.generation != generation: continue
+                try:
+                    thread_id = record.get("_tid") or (data.get("threadId") if data else None)
+                    if thread_id: self._insert(room, int(thread_id), last_id, int(record.get("user_id") or 0))
+                except Exception: _swallowed("ThreadIndex.apply_page")
+            done = len(rows) < self.page_size
+            self._mark(room, generation, after, upto if done and upto is not None else last_id, done and upto is None)
+        return last_id
+
+    def _scan(self, chat: ChatContext, room: _RoomIndex, generation: int, after: int, upto: Optional[int] = None) -> int:
+        room_id = int(chat.room.id)
+        last_id = after
+        while True:
+            rows, _ = _query_planned(chat.api, lambda planned: self._page_query(room_id, last_id, upto, planned))
+            _count("rows_scanned", len(rows))
+            last_id = self._apply_page(room, generation, after, upto, rows, _decode_supplements(chat, rows), last_id)
+            if len(rows) < self.page_size: return last_id
+
+    def _plan(self, room: _RoomIndex, thread_id: int) -> List[tuple]:
+        """스레드 조회 전에 스캔해야 할 (after, upto) 구간 목록"""
+        if room.low is None: return [(thread_id, None)]
+        ranges = []
+        if thread_id < room.low: ranges.append((thread_id, room.low))
+        if not room.live or time.monotonic() - room.checked_at >= self.reconcile_interval:
+            ranges.append((room.high, None))
+        return ranges
+
+    @staticmethod
+    def _mark(room: _RoomIndex, generation: int, after: int, covered_to: int, tail_done: bool = False):
+        """(after, covered_to] 구간 스캔을 커버리지에 반영 (tail_done이면 방의 끝까지 확인한 시각도 기록)"""
+        if room.generation != generation: return
+        if room.low is None:
+            room.low, room.high = after, covered_to
+        elif after <= room.high and covered_to >= room.low:
+            room.low, room.high = min(room.low, after), max(room.high, covered_to)
+        else: return
+        if tail_done: room.checked_at = time.monotonic()
+
+    def _get(self, room: _RoomIndex, thread_id: int):
+        ids, senders = room.threads.get(int(thread_id), ([], []))
+        return list(ids), list(senders)
+
+    def _indexed(self, room: _RoomIndex, generation: int, thread_id: int):
+        """스캔 후 인덱스에서 답할 수 있으면 복사본, 아니면 None (초기화·상한 초과)"""
+        with room.lock:
+            if room.generation != generation or thread_id in room.overflow: return None
+            return self._get(room, thread_id)
+
+    @staticmethod
+    def _collect(rows: List[dict], decoded: List[Optional[dict]], thread_id: int, ids: List[int], senders: List[int], last_id: int) -> int:
+        for record, data in zip(rows, decoded):
+            last_id = int(record["id"])
+            try:
+                tid = record.get("_tid") or (data.get("threadId") if data else None)
+                if tid and int(tid) == thread_id:
+                    ids.append(last_id)
+                    senders.append(int(record.get("user_id") or 0))
+            except Exception: _swallowed("ThreadIndex.collect")
+        return last_id
+
+    def _iter_scan_thread(self, chat: ChatContext, thread_id: int, after_id: int) -> Iterator[tuple]:
+        """인덱스에 둘 수 없는 스레드는 저장하지 않고 직접 스캔하여 페이지별 (답장 ID, 발신자 ID) 생성"""
+        room_id = int(chat.room.id)
+        last_id = after_id
+        while True:
+            rows, _ = _query_planned(chat.api, lambda planned: self._page_query(room_id, last_id, None, planned))
+            _count("rows_scanned", len(rows))
+            ids, senders = [], []
+            last_id = self._collect(rows, _decode_supplements(chat, rows), thread_id, ids, senders, last_id)
+            if ids: yield ids, senders
+            if len(rows) < self.page_size: return
+
+    def _scan_thread(self, chat: ChatContext, thread_id: int):
+        ids, senders = [], []
+        for page_ids, page_senders in self._iter_scan_thread(chat, thread_id, thread_id):
+            ids.extend(page_ids)
+            senders.extend(page_senders)
+        return ids, senders
+
+    def _known(self, room: _RoomIndex, generation: int, thread_id: int, after: int, upto: Optional[int]) -> Optional[List[int]]:
+        """인덱스에 있는 (after, upto] 구간 답장 ID (초기화·상한 초과로 믿을 수 없으면 None)"""
+        with room.lock:
+            if room.generation != generation or thread_id in room.overflow: return None
+            ids = room.threads.get(thread_id, ([], []))[0]
+            start = bisect.bisect_right(ids, after)
+            end = len(ids) if upto is None else bisect.bisect_right(ids, upto)
+            return ids[start:end]
+
+    def iter_reply_ids(self, chat: ChatContext, thread_id: int, after_id: Optional[int] = None) -> Iterator[List[int]]:
+        """after_id 이후 답장 ID를 오름차순 묶음으로 생성
+
+        백필 스캔이 필요하면 스캔 페이지마다 그때까지 확정된 답장을 바로 내보내므로,
+        첫 결과가 방 전체 스캔을 기다리지 않습니다. 순회를 멈추면 남은 스캔도 하지 않습니다.
+        """
+        thread_id = int(thread_id)
+        room_id = int(chat.room.id)
+        room = self._room(room_id)
+        emitted = max(thread_id, int(after_id or 0))
+        with room.lock:
+            ranges, generation = self._plan(room, thread_id), room.generation
+        for after, upto in ranges:
+            # 이 구간 앞은 이미 인덱스에 있으므로 스캔 전에 내보냄 (호출자가 충분히 받으면 스캔하지 않음)
+            ids = self._known(room, generation, thread_id, emitted, after)
+            if ids:
+                emitted = ids[-1]
+                yield ids
+            last_id = after
+            while True:
+                rows, _ = _query_planned(chat.api, lambda planned: self._page_query(room_id, last_id, upto, planned))
+                _count("rows_scanned", len(rows))
+                last_id = self._apply_page(room, generation, after, upto, rows, _decode_supplements(chat, rows), last_id)
+                ids = self._known(room, generation, thread_id, emitted, last_id)
+                if ids is None:
+                    for page_ids, _ in self._iter_scan_thread(chat, thread_id, emitted): yield page_ids
+                    return
+                if ids:
+                    emitted = ids[-1]
+                    yield ids
+                if len(rows) < self.page_size: break
+        ids = self._known(room, generation, thread_id, emitted, None)
+        if ids is None:
+            for page_ids, _ in self._iter_scan_thread(chat, thread_id, emitted): yield page_ids
+        elif ids:
+            yield ids
+
+    def replies(self, chat: ChatContext, thread_id: int):
+        """스레드의 (답장 ID 리스트, 발신자 ID 리스트) 복사본 반환
+
+        백필 스캔은 방의 데이터 잠금 밖에서 하므로 add()/observe()를 막지 않으며,
+        같은 방의 스캔끼리만 scan_lock으로 직렬화합니다.
+        """
+        thread_id = int(thread_id)
+        room = self._room(int(chat.room.id))
+        with room.scan_lock:
+            with room.lock:
+                ranges, generation = self._plan(room, thread_id), room.generation
+            for after, upto in ranges: self._scan(chat, room, generation, after, upto)
+            result = self._indexed(room, generation, thread_id)
+        return result if result is not None else self._scan_thread(chat, thread_id)
+
+    def peek(self, room_id: int, thread_id: int):
+        """스캔 없이 답할 수 있으면 (답장 ID 리스트, 발신자 ID 리스트), 아니면 None"""
+        room = self._room(int(room_id), create=False)
+        if room is None: return None
+        with room.lock:
+            if self._plan(room, int(thread_id)) or int(thread_id) in room.overflow: return None
+            return self._get(room, thread_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock: rooms = list(self._rooms.values())
+        return {"rooms": len(rooms), "replies": sum(r.size for r in rooms), "overflow": sum(len(r.overflow) for r in rooms)}
+
+    def clear(self, room_id: Optional[int] = None):
+        with self._lock:
+            if room_id is None: self._rooms.clear()
+            else: self._rooms.pop(int(room_id), None)
+
+_THREAD_INDEX = ThreadIndex()
+
+def configure_thread_index(**kwargs) -> ThreadIndex:
+    """스레드 인덱스를 새 설정(ThreadIndex 인자)으로 교체 (기존 인덱스는 버리고 다음 조회에서 다시 백필)"""
+    global _THREAD_INDEX
+    _THREAD_INDEX = ThreadIndex(**kwargs)
+    return _THREAD_INDEX
+
+@_budgeted()
 def get_thread_id(chat: ChatContext) -> Optional[int]:
     """현재 메시지의 원본 스레드 ID 반환"""
     try:
@@ -227,67 +1635,411 @@ def get_thread_id(chat: ChatContext) -> Optional[int]:
         user_id = int(chat.raw.get("user_id", chat.sender.id))
         if not supplement: return None
         data = _decrypt_supplement(chat, supplement, user_id)
-        if data and "threadId" in data: return int(data["threadId"])
-    except: pass
+        if data and "threadId" in data:
+            thread_id = int(data["threadId"])
+            _THREAD_INDEX.add(chat.room.id, thread_id, chat.message.id, user_id)
+            return thread_id
+    except Exception: _swallowed("get_thread_id")
     return None
 
+def track_thread_message(chat: ChatContext) -> Optional[int]:
+    """message 이벤트 핸들러에서 호출하여 스레드 인덱스와 원본 캐시를 실시간으로 갱신하고 구독 콜백을 호출"""
+    thread_id = get_thread_id(chat)
+    try:
+        _THREAD_INDEX.observe(chat.room.id, chat.message.id)
+        for message_id in _hidden_message_ids(chat):
+            invalidate_thread_source(chat.room.id, message_id)
+    except Exception: _swallowed("track_thread_message")
+    if thread_id: _SUBSCRIPTIONS.dispatch(chat, thread_id)
+    return thread_id
+
+class Subscription:
+    """subscribe_thread()가 반환하는 구독 핸들 (cancel()로 해지)"""
+    __slots__ = ('thread_id', 'callback', 'expires_at', '_registry')
+
+    def __init__(self, registry, thread_id: int, callback, expires_at: Optional[float]):
+        self.thread_id = thread_id
+        self.callback = callback
+        self.expires_at = expires_at
+        self._registry = registry
+
+    @property
+    def active(self) -> bool:
+        return self._registry.is_active(self)
+
+    def cancel(self):
+        self._registry.unsubscribe(self)
+
+    def __repr__(self):
+        return f"Subscription(thread_id={self.thread_id}, active={self.active})"
+
+class ThreadSubscriptions:
+    """스레드별 메시지 콜백 레지스트리
+
+    track_thread_message()가 이미 복호화한 threadId로 딕셔너리를 한 번 조회하여 콜백을 호출하므로,
+    메시지당 비용은 구독 수와 관계없이 일정합니다. 구독은 ttl초 후 만료되며(None이면 무기한),
+    max_subscriptions를 넘으면 가장 오래된 구독부터 해지됩니다.
+    같은 메시지는 track_thread_message()가 여러 번 호출되어도 한 번만 전달합니다.
+    """
+    _RECENT_SIZE = 1024
+
+    def __init__(self, max_subscriptions: int = 1000, ttl: Optional[float] = 3600):
+        self.max_subscriptions = max_subscriptions
+        self.ttl = ttl
+        self._threads = {}
+        self._order = OrderedDict()
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self.dispatched = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def subscribe(self, thread_id: int, callback, ttl: Optional[float] = -1) -> Subscription:
+        """thread_id 스레드에 답장이 올 때마다 callback(chat) 호출 (ttl=-1이면 기본 ttl, None이면 무기한)"""
+        if ttl == -1: ttl = self.ttl
+        sub = Subscription(self, int(thread_id), callback, time.monotonic() + ttl if ttl is not None else None)
+        with self._lock:
+            if len(self._order) >= self.max_subscriptions: self._make_room(time.monotonic())
+            self._threads.setdefault(sub.thread_id, []).append(sub)
+            self._order[sub] = None
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock: self._remove(sub)
+
+    def is_active(self, sub: Subscription) -> bool:
+        return sub in self._order and (sub.expires_at is None or sub.expires_at > time.monotonic())
+
+    def _remove(self, sub: Subscription):
+        if sub not in self._order: return
+        del self._order[sub]
+        subs = self._threads.get(sub.thread_id)
+        if subs is None: return
+        subs.remove(sub)
+        if not subs: del self._threads[sub.thread_id]
+
+    def _make_room(self, now: float):
+        for sub in [s for s in self._order if s.expires_at is not None and s.expires_at <= now]:
+            self._remove(sub)
+            self.expired += 1
+        while len(self._order) >= self.max_subscriptions:
+            self._remove(next(iter(self._order)))
+            self.evicted += 1
+
+    def dispatch(self, chat: ChatContext, thread_id: int) -> int:
+        """thread_id 구독 콜백 호출 (호출된 콜백 수 반환)"""
+        if not self._threads.get(thread_id): return 0
+        now = time.monotonic()
+        key = (int(chat.room.id), int(chat.message.id))
+        with self._lock:
+            if key in self._recent: return 0
+            self._recent[key] = None
+            if len(self._recent) > self._RECENT_SIZE: self._recent.popitem(last=False)
+            live = []
+            for sub in list(self._threads.get(thread_id, ())):
+                if sub.expires_at is not None and sub.expires_at <= now:
+                    self._remove(sub)
+                    self.expired += 1
+                else:
+                    live.append(sub)
+            self.dispatched += len(live)
+        for sub in live:
+            try: sub.callback(chat)
+            except DeadlineExceeded: pass
+            except Exception: _swallowed("subscription.callback")
+        return len(live)
+
+    def clear(self):
+        with self._lock:
+            self._threads.clear()
+            self._order.clear()
+            self._recent.clear()
+
+    def __len__(self):
+        return len(self._order)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"subscriptions": len(self._order), "threads": len(self._threads), "dispatched": self.dispatched, "expired": self.expired, "evicted": self.evicted}
+
+_SUBSCRIPTIONS = ThreadSubscriptions()
+
+def subscribe_thread(thread_id: int, callback, ttl: Optional[float] = -1) -> Subscription:
+    """스레드 답장 구독 (message 핸들러에서 track_thread_message(chat)를 호출해야 전달됨, bot.on_thread는 자동 등록)"""
+    return _SUBSCRIPTIONS.subscribe(thread_id, callback, ttl)
+
+def configure_subscriptions(max_subscriptions: int = 1000, ttl: Optional[float] = 3600) -> None:
+    """구독 상한과 기본 만료 시간 설정"""
+    _SUBSCRIPTIONS.max_subscriptions = max_subscriptions
+    _SUBSCRIPTIONS.ttl = ttl
+
+_BOT_HOOK_LOCK = threading.Lock()
+
+def _bot_on_thread(self, thread_id: int, ttl: Optional[float] = -1):
+    """@bot.on_thread(thread_id) 데코레이터: 해당 스레드의 답장만 받는 핸들러 등록
+
+    처음 호출될 때 봇에 track_thread_message를 message 핸들러로 한 번 등록하므로 별도 핸들러 없이 전달됩니다.
+    """
+    with _BOT_HOOK_LOCK:
+        if not getattr(self, "_thread_dispatch_hooked", False):
+            self.on_event("message")(track_thread_message)
+            self._thread_dispatch_hooked = True
+    def decorator(func):
+        subscribe_thread(thread_id, func, ttl)
+        return func
+    return decorator
+
+Bot.on_thread = _bot_on_thread
+
+@_budgeted(False)
 def is_reply_or_thread(chat: ChatContext) -> bool:
     """메시지가 답장 또는 스레드인지 확인"""
     if chat.message.type == 26: return True
     return get_thread_id(chat) is not None
 
+@_budgeted()
 def get_thread_source(chat: ChatContext) -> Optional[ChatContext]:
     """스레드의 원본 메시지 객체 조회"""
     if chat.message.type == 26: return chat.get_source()
     thread_id = get_thread_id(chat)
     if not thread_id: return None
-    try:
-        result = chat.api.query("SELECT * FROM chat_logs WHERE id = ?", [thread_id])
-        if result: return _make_chat_from_record(chat, result[0])
-    except: pass
-    return None
-
+    key = (int(chat.room.id), int(thread_id))
+    record = _SOURCE_CACHE.get(key)
+    if record is None:
+        try: record = _SOURCE_FLIGHT.do(key, lambda: _load_source(chat, key))
+        except Exception: return _swallowed("get_thread_source")
+        if record is None: return None
+    return _make_chat_from_record(chat, dict(record))
+
+def _load_source(chat: ChatContext, key: tuple) -> Optional[dict]:
+    result = _query_records(chat.api, "id = ?", [key[1]])
+    if not result: return None
+    _SOURCE_CACHE.set(key, result[0])
+    return result[0]
+
+def invalidate_thread_source(room_id: int, message_id: int) -> None:
+    """캐시된 스레드 원본 메시지 제거 (메시지 수정 등 직접 무효화가 필요할 때)"""
+    _SOURCE_CACHE.delete((int(room_id), int(message_id)))
+
+_HIDDEN_FEED_TYPES = (14, 26)  # 14: 메시지 삭제, 26: 관리자 가리기
+
+def _hidden_message_ids(chat: ChatContext) -> List[int]:
+    """삭제/가리기 피드 메시지가 가리키는 메시지 ID 목록"""
+    msg = chat.message.msg or ""
+    if chat.message.type != 0 or not msg.startswith("{"): return []
+    try: feed = json.loads(msg)
+    except Exception: return _swallowed("hidden_message_ids", [])
+    if feed.get("feedType") not in _HIDDEN_FEED_TYPES: return []
+    ids = feed.get("logIds") or ([feed["logId"]] if feed.get("logId") else [])
+    return [int(i) for i in ids]
+
+@_budgeted(list)
 def get_thread_messages(chat: ChatContext, source_message_id: int, limit: int = 50) -> List[ChatContext]:
     """특정 원본에 달린 답장 리스트 조회 (최적화됨)"""
+    if limit <= 0: return []
+    messages = []
     try:
-        result = chat.api.query("SELECT * FROM chat_logs WHERE chat_id = ? AND id > ? AND supplement IS NOT NULL ORDER BY id ASC LIMIT ?", [chat.room.id, source_message_id, limit * 3])
-        
-        thread_replies = []
-        raw_matches = []
-        user_ids_set = set()
-        
-        for record in result:
-            uid = int(record.get("user_id", 0))
-            if uid: user_ids_set.add(uid)
-            
-            try:
-                data = _decrypt_supplement(chat, record.get("supplement", ""), uid)
-                if data and data.get("threadId") == source_message_id:
-                    raw_matches.append(record)
-                    if len(raw_matches) >= limit: break
-            except: pass
-            
-        user_cache = _fetch_users_batch(chat.api, user_ids_set)
+        for message in islice(iter_thread_messages(chat, source_message_id, page_size=limit), limit):
+            messages.append(message)
+    except DeadlineExceeded: pass
+    except Exception: return _swallowed("get_thread_messages", [])
+    return messages
+
+def iter_thread_messages(chat: ChatContext, source_message_id: int, page_size: int = 50, use_index: bool = True, after_id: Optional[int] = None) -> Iterator[ChatContext]:
+    """답장을 ID 기준 키셋 페이지(id > last_id) 단위로 생성하는 제너레이터
+
+    페이지마다 유저 조회와 ChatContext 생성을 수행하므로 메모리 사용량이 일정하며,
+    호출자가 순회를 멈추면 더 이상 조회하지 않습니다.
+    use_index=True이면 스레드 인덱스를 쓰며, 방을 아직 백필하지 않았으면 원본 이후 구간을 스캔하면서
+    확정된 답장부터 생성합니다 (스캔 페이지 하나에 답장이 없으면 첫 결과는 답장이 나오는 페이지까지 기다림).
+    use_index=False이면 인덱스 없이 chat_logs를 직접 스캔하고 인덱스도 갱신하지 않습니다.
+    after_id를 주면 그 ID 이후의 답장만 생성합니다.
+    """
+    page_size = max(1, min(int(page_size), _MAX_BIND_VARS))
+    source_message_id = int(source_message_id)
+    pages = _iter_index_pages if use_index else _iter_scan_pages
+    for records in pages(chat, source_message_id, page_size, after_id):
+        # 예산이 끝나도 이미 캐시에 있는 레코드까지는 생성 (다음 I/O에서 DeadlineExceeded)
+        try: user_cache = _prepare_records(chat, records)
+        except DeadlineExceeded: user_cache = None
+        for record in records:
+            thread_chat = _make_chat_from_record(chat, record, user_cache)
+            if thread_chat: yield thread_chat
+
+_UNSET = object()
 
-        for record in raw_matches:
+class ThreadRow:
+    """지연 변환되는 스레드 답장 (chat_logs 레코드 + 필요할 때 계산되는 값)
+
+    id / user_id / created_at은 레코드에서 바로 읽고, 발신자 이름·메시지 본문·v는
+    처음 접근할 때 복호화·파싱합니다. to_context()로 일반 ChatContext를 만들 수 있습니다.
+    """
+    __slots__ = ('_chat', '_record', '_users', '_name', '_text', '_v', '_context')
+
+    def __init__(self, chat: ChatContext, record: dict, users: Optional[Dict[int, Any]] = None):
+        self._chat = chat
+        self._record = record
+        self._users = users
+        self._name = _UNSET
+        self._text = _UNSET
+        self._v = _UNSET
+        self._context = None
+
+    @property
+    def id(self) -> int:
+        return int(self._record["id"])
+
+    @property
+    def user_id(self) -> int:
+        return int(self._record.get("user_id") or 0)
+
+    @property
+    def created_at(self) -> int:
+        return int(self._record.get("created_at") or 0)
+
+    @property
+    def type(self) -> int:
+        return int(self._record.get("type") or 0)
+
+    @property
+    def raw(self) -> dict:
+        return self._record
+
+    def _user_info(self) -> Optional[Dict[str, Any]]:
+        info = self._users.get(self.user_id) if self._users else None
+        return info or _get_user_name_cached(self._chat.api, self.user_id)
+
+    @property
+    def sender_name(self) -> Optional[str]:
+        """발신자 닉네임 (첫 접근 시 복호화)"""
+        if self._name is _UNSET:
+            info = self._user_info() or {}
+            name, enc = info.get("name"), info.get("enc")
+            if name and enc and _is_encrypted_name(name):
+                name = _decrypt_cached(self._chat.api, int(enc), name, self.user_id) or name
+            self._name = name
+        return self._name
+
+    @property
+    def message(self) -> str:
+        """메시지 본문 (첫 접근 시 복호화)"""
+        if self._text is _UNSET:
+            text = self._record.get("message") or ""
+            enc = (self._user_info() or {}).get("enc")
+            if enc and text and not text.startswith("{"):
+                text = _decrypt_cached(self._chat.api, int(enc), text, self.user_id) or text
+            self._text = text
+        return self._text
+
+    @property
+    def v(self) -> dict:
+        if self._v is _UNSET:
+            try: self._v = json.loads(self._record.get("v") or "{}")
+            except Exception: self._v = _swallowed("ThreadRow.v", {})
+        return self._v
+
+    def to_context(self) -> Optional[ChatContext]:
+        """일반 ChatContext로 변환 (결과는 재사용)"""
+        if self._context is None:
+            self._context = _make_chat_from_record(self._chat, self._record, self._users)
+        return self._context
+
+    def __repr__(self):
+        return f"ThreadRow(id={self.id}, user_id={self.user_id})"
+
+def iter_thread_rows(chat: ChatContext, source_message_id: int, page_size: int = 50, use_index: bool = True) -> Iterator[ThreadRow]:
+    """답장을 ThreadRow로 생성 (유저 조회·복호화 없이 ID·발신자 ID만 필요한 경우용)"""
+    page_size = max(1, min(int(page_size), _MAX_BIND_VARS))
+    source_message_id = int(source_message_id)
+    pages = _iter_index_pages if use_index else _iter_scan_pages
+    for records in pages(chat, source_message_id, page_size):
+        for record in records:
+            yield ThreadRow(chat, record)
+
+def _iter_index_pages(chat: ChatContext, source_message_id: int, page_size: int, after_id: Optional[int] = None) -> Iterator[List[dict]]:
+    # 첫 페이지는 확정되는 대로 바로 내보내고, 이후에는 page_size만큼 모아서 조회
+    pending, first = [], True
+    def _page():
+        nonlocal pending, first
+        page_ids, pending, first = pending[:page_size], pending[page_size:], False
+        records = _fetch_records(chat.api, page_ids)
+        _count("rows_scanned", len(records))
+        _count("rows_matched", len(records))
+        return records
+    for reply_ids in _THREAD_INDEX.iter_reply_ids(chat, source_message_id, after_id):
+        pending.extend(reply_ids)
+        while pending and (first or len(pending) >= page_size):
+            records = _page()
+            if records: yield records
+    while pending:
+        records = _page()
+        if records: yield records
+
+def _scan_page_query(room_id: int, last_id: int, source_message_id: int, page_size: int, planned: bool):
+    if not planned:
+        return f"SELECT {_record_columns()} FROM chat_logs WHERE chat_id = ? AND id > ? AND supplement IS NOT NULL ORDER BY id ASC LIMIT ?", [room_id, last_id, page_size]
+    # 평문 supplement는 SQL에서 threadId로 거르고, 암호화된 supplement만 그대로 가져옴
+    return (f"SELECT {_record_columns()}, {_SQL_THREAD_ID} AS _tid FROM chat_logs WHERE chat_id = ? AND id > ? AND supplement IS NOT NULL "
+            f"AND ({_SQL_THREAD_ID} = ? OR NOT {_SQL_PLAIN}) ORDER BY id ASC LIMIT ?"), [room_id, last_id, source_message_id, page_size]
+
+def _iter_scan_pages(chat: ChatContext, source_message_id: int, page_size: int, after_id: Optional[int] = None) -> Iterator[List[dict]]:
+    last_id = max(source_message_id, int(after_id or 0))
+    while True:
+        rows, planned = _query_planned(chat.api, lambda planned: _scan_page_query(chat.room.id, last_id, source_message_id, page_size, planned))
+        if not rows: return
+        _count("rows_scanned", len(rows))
+        last_id = int(rows[-1]["id"])
+        matched = set()
+        if planned:
+            encrypted = []
+            for record in rows:
+                if record.pop("_tid", None) is not None: matched.add(int(record["id"]))
+                else: encrypted.append(record)
+        else:
+            encrypted = rows
+        for record, data in zip(encrypted, _decode_supplements(chat, encrypted)):
+            try:
+                if data and data.get("threadId") and int(data["threadId"]) == source_message_id:
+                    matched.add(int(record["id"]))
+            except Exception: _swallowed("iter_scan_pages")
+        matches = [record for record in rows if int(record["id"]) in matched]
+        _count("rows_matched", len(matches))
+        if matches: yield matches
+        if len(rows) < page_size: return
+
+def _build_replies(chat: ChatContext, reply_ids: List[int], user_ids: Set[int]) -> List[ChatContext]:
+    if not reply_ids: return []
+    records = _fetch_records(chat.api, reply_ids)
+    try: user_cache = _prepare_records(chat, records, user_ids)
+    except DeadlineExceeded: user_cache = None
+    thread_replies = []
+    try:
+        for record in records:
             thread_chat = _make_chat_from_record(chat, record, user_cache)
             if thread_chat: thread_replies.append(thread_chat)
-            
-        return thread_replies
-    except: return []
+    except DeadlineExceeded: pass
+    return thread_replies
+
+def _participant_info(c: ChatContext) -> Dict[str, Any]:
+    return {
+        "name": c.sender.name,
+        "id": c.sender.id,
+        "msgId": c.message.id,
+        "msg": c.message.msg
+    }
 
+def _participants_from(chat: ChatContext, source: Optional[ChatContext], replies: List[ChatContext]) -> List[Dict[str, Any]]:
+    participants = {}
+    for c in ([source] if source else []) + list(replies) + [chat]:
+        participants[c.sender.id] = _participant_info(c)
+    return list(participants.values())
+
+@_budgeted(list)
 def get_participant_list(chat: ChatContext, limit: int = 50) -> List[Dict[str, Any]]:
     """스레드 참여자 정보를 딕셔너리 리스트로 반환"""
     source = get_thread_source(chat)
     participants = {} 
-    
-    def _info(c):
-        return {
-            "name": c.sender.name,
-            "id": c.sender.id,
-            "msgId": c.message.id,
-            "msg": c.message.msg
-        }
+    _info = _participant_info
 
     if source:
         participants[source.sender.id] = _info(source)
@@ -296,16 +2048,32 @@ def get_participant_list(chat: ChatContext, limit: int = 50) -> List[Dict[str, A
         tid = get_thread_id(chat)
         if not tid: return [_info(chat)]
 
-    replies = get_thread_messages(chat, tid, limit=limit)
+    try:
+        reply_ids, sender_ids = _THREAD_INDEX.replies(chat, tid)
+        # 참여자별 첫 답장 (ID 순이므로 첫 등장 순서와 같음)
+        first_by_sender = {}
+        for sender_id, reply_id in zip(sender_ids[:limit], reply_ids[:limit]): first_by_sender.setdefault(sender_id, reply_id)
+        replies = _build_replies(chat, sorted(first_by_sender.values()), set(first_by_sender))
+    except DeadlineExceeded: replies = []
+    except Exception: replies = _swallowed("get_participant_list", [])
     for r in replies:
         participants[r.sender.id] = _info(r)
 
     participants[chat.sender.id] = _info(chat)
     return list(participants.values())
 
-def get_thread_summary(chat: ChatContext) -> Dict[str, Any]:
-    """스레드 상태 요약 정보 (딕셔너리)"""
-    data = get_thread_as_dict(chat)
+@_budgeted(dict)
+def get_thread_summary(chat: ChatContext, limit: int = 100) -> Dict[str, Any]:
+    """스레드 상태 요약 정보 (딕셔너리, 스레드 인덱스의 발신자 ID만 사용하므로 답장 레코드를 조회하지 않음)"""
+    source = get_thread_source(chat)
+    if not source: return _summary_from(None)
+    try: _, sender_ids = _THREAD_INDEX.replies(chat, source.message.id)
+    except DeadlineExceeded: sender_ids = []
+    except Exception: sender_ids = _swallowed("get_thread_summary", [])
+    sender_ids = sender_ids[:max(limit, 0)]
+    return {"owner": source.sender.name, "msgCount": len(sender_ids) + 1, "participantCount": len({source.sender.id, *sender_ids})}
+
+def _summary_from(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     if not data: return {"error": "Not a thread"}
     
     m = data['metadata']
@@ -316,20 +2084,83 @@ def get_thread_summary(chat: ChatContext) -> Dict[str, Any]:
         "participantCount": m['unique_participants']
     }
 
+@_budgeted(list)
 def filter_thread_by_user(chat: ChatContext, target_user_id: Union[int, str]) -> List[ChatContext]:
     """스레드 내 특정 유저 메시지만 필터링"""
     source = get_thread_source(chat)
     if not source: return [chat] if str(chat.sender.id) == str(target_user_id) else []
-    all_msgs = [source] + get_thread_messages(chat, source.message.id, limit=200)
-    return [m for m in all_msgs if str(m.sender.id) == str(target_user_id)]
-
+    target = str(target_user_id)
+    result = [source] if str(source.sender.id) == target else []
+    try:
+        for message in iter_user_thread_messages(chat, source.message.id, int(target_user_id)):
+            result.append(message)
+    except DeadlineExceeded: pass
+    except Exception: _swallowed("filter_thread_by_user")
+    return result
+
+def iter_user_thread_messages(chat: ChatContext, source_message_id: int, user_id: int, page_size: int = 100) -> Iterator[ChatContext]:
+    """스레드에서 특정 유저의 답장만 페이지 단위로 생성
+
+    스레드 인덱스가 최신이면 인덱스의 발신자 정보로 해당 유저의 답장 ID만 조회하고,
+    아니면 chat_logs를 user_id로 제한하여 스캔하므로 비용이 스레드 전체가 아닌 그 유저의 메시지 수에 비례합니다.
+    """
+    page_size = max(1, min(int(page_size), _MAX_BIND_VARS))
+    source_message_id, user_id = int(source_message_id), int(user_id)
+    indexed = _THREAD_INDEX.peek(chat.room.id, source_message_id)
+    if indexed is not None:
+        reply_ids = [mid for mid, uid in zip(*indexed) if uid == user_id]
+        pages = (_fetch_records(chat.api, reply_ids[i:i + page_size]) for i in range(0, len(reply_ids), page_size))
+    else:
+        pages = _iter_user_scan_pages(chat, source_message_id, user_id, page_size)
+    for records in pages:
+        try: user_cache = _prepare_records(chat, records, {user_id})
+        except DeadlineExceeded: user_cache = None
+        for record in records:
+            thread_chat = _make_chat_from_record(chat, record, user_cache)
+            if thread_chat: yield thread_chat
+
+def _user_scan_page_query(room_id: int, user_id: int, last_id: int, source_message_id: int, page_size: int, planned: bool):
+    if not planned:
+        return f"SELECT {_record_columns()} FROM chat_logs WHERE chat_id = ? AND user_id = ? AND id > ? AND supplement IS NOT NULL ORDER BY id ASC LIMIT ?", [room_id, user_id, last_id, page_size]
+    return (f"SELECT {_record_columns()}, {_SQL_THREAD_ID} AS _tid FROM chat_logs WHERE chat_id = ? AND user_id = ? AND id > ? AND supplement IS NOT NULL "
+            f"AND ({_SQL_THREAD_ID} = ? OR NOT {_SQL_PLAIN}) ORDER BY id ASC LIMIT ?"), [room_id, user_id, last_id, source_message_id, page_size]
+
+def _iter_user_scan_pages(chat: ChatContext, source_message_id: int, user_id: int, page_size: int) -> Iterator[List[dict]]:
+    room_id = int(chat.room.id)
+    last_id = source_message_id
+    while True:
+        rows, _ = _query_planned(chat.api, lambda planned: _user_scan_page_query(room_id, user_id, last_id, source_message_id, page_size, planned))
+        if not rows: return
+        _count("rows_scanned", len(rows))
+        last_id = int(rows[-1]["id"])
+        matches = []
+        # 모든 행의 발신자가 같으므로 supplement 복호화에 필요한 enc 조회는 한 번뿐
+        encrypted = [r for r in rows if r.get("_tid") is None]
+        decoded = dict(zip((int(r["id"]) for r in encrypted), _decode_supplements(chat, encrypted)))
+        for record in rows:
+            thread_id = record.pop("_tid", None)
+            if thread_id is None:
+                data = decoded.get(int(record["id"]))
+                thread_id = data.get("threadId") if data else None
+            try:
+                if thread_id and int(thread_id) == source_message_id:
+                    matches.append(record)
+                    _THREAD_INDEX.add(room_id, source_message_id, int(record["id"]), user_id)
+            except Exception: _swallowed("iter_user_scan_pages")
+        _count("rows_matched", len(matches))
+        if matches: yield matches
+        if len(rows) < page_size: return
+
+@_budgeted()
 def get_thread_as_dict(chat: ChatContext, limit: int = 100) -> Optional[Dict[str, Any]]:
     """스레드 전체를 데이터 구조화하여 반환"""
     source = get_thread_source(chat)
     if not source: return None
     
     replies = get_thread_messages(chat, source.message.id, limit=limit)
-    
+    return _thread_dict_from(chat, source, replies)
+
+def _thread_dict_from(chat: ChatContext, source: ChatContext, replies: List[ChatContext]) -> Dict[str, Any]:
     def _user(u):
         return {"name": u.name, "id": u.id}
 
@@ -337,7 +2168,7 @@ def get_thread_as_dict(chat: ChatContext, limit: int = 100) -> Optional[Dict[str
         start_ts = int(source.raw.get("created_at") or 0)
         end_ts = int(replies[-1].raw.get("created_at") or start_ts) if replies else start_ts
         duration = end_ts - start_ts
-    except: duration = 0
+    except Exception: duration = _swallowed("thread_dict_from", 0)
 
     return {
         "source": {
@@ -362,11 +2193,114 @@ def get_thread_as_dict(chat: ChatContext, limit: int = 100) -> Optional[Dict[str
         }
     }
 
+def _room_page_query(room_id: int, last_id: int, until_id: Optional[int], page_size: int, planned: bool):
+    bounds = "AND id <= ? " if until_id is not None else ""
+    bind = [room_id, last_id] + ([until_id] if until_id is not None else []) + [page_size]
+    if not planned:
+        return f"SELECT id, user_id, created_at, supplement FROM chat_logs WHERE chat_id = ? AND id > ? {bounds}AND supplement IS NOT NULL ORDER BY id ASC LIMIT ?", bind
+    return (f"SELECT id, user_id, created_at, CASE WHEN {_SQL_PLAIN} THEN NULL ELSE supplement END AS supplement, {_SQL_THREAD_ID} AS _tid "
+            f"FROM chat_logs WHERE chat_id = ? AND id > ? {bounds}AND supplement IS NOT NULL "
+            f"AND ({_SQL_THREAD_ID} IS NOT NULL OR NOT {_SQL_PLAIN}) ORDER BY id ASC LIMIT ?"), bind
+
+def _display_names(api_wrapper, user_ids: Set[int]) -> Dict[int, Optional[str]]:
+    """유저 ID -> 복호화된 닉네임 (일괄 조회·일괄 복호화)"""
+    users = _fetch_users_batch(api_wrapper, user_ids)
+    names = {uid: (users.get(uid) or {}).get("name") for uid in user_ids}
+    items = [(int(users[uid]["enc"]), name, uid) for uid, name in names.items()
+             if name and users[uid].get("enc") and _is_encrypted_name(name)]
+    for (_, _, uid), decrypted in zip(items, _decrypt_many(api_wrapper, items)):
+        if decrypted: names[uid] = decrypted
+    return names
+
+@_budgeted(list)
+def get_room_threads(chat: ChatContext, since_id: Optional[int] = None, until_id: Optional[int] = None, page_size: int = 500) -> List[Dict[str, Any]]:
+    """방 전체 스레드 요약을 한 번의 순차 스캔으로 생성 (since_id < 답장 ID <= until_id)
+
+    답장을 threadId별로 모으고, 원본 메시지와 발신자는 일괄 조회합니다.
+    스캔한 답장은 스레드 인덱스에도 반영됩니다.
+    """
+    room_id = int(chat.room.id)
+    page_size = max(1, min(int(page_size), _MAX_BIND_VARS))
+    threads = {}
+    last_id = int(since_id or 0)
+    while True:
+        try: rows, planned = _query_planned(chat.api, lambda planned: _room_page_query(room_id, last_id, until_id, page_size, planned))
+        except DeadlineExceeded: break
+        if not rows: break
+        _count("rows_scanned", len(rows))
+        try: decoded = _decode_supplements(chat, rows)
+        except DeadlineExceeded: break
+        last_id = int(rows[-1]["id"])
+        for record, data in zip(rows, decoded):
+            try:
+                thread_id = record.get("_tid") or (data.get("threadId") if data else None)
+                if not thread_id: continue
+                thread_id, message_id, user_id = int(thread_id), int(record["id"]), int(record.get("user_id") or 0)
+            except Exception:
+                _swallowed("get_room_threads")
+                continue
+            _THREAD_INDEX.add(room_id, thread_id, message_id, user_id)
+            t = threads.get(thread_id)
+            if t is None: t = threads[thread_id] = {"count": 0, "users": {}, "first": None, "last": None, "last_id": None}
+            t["count"] += 1
+            t["users"].setdefault(user_id, None)
+            created_at = int(record.get("created_at") or 0)
+            if t["first"] is None: t["first"] = created_at
+            t["last"], t["last_id"] = created_at, message_id
+        if len(rows) < page_size: break
+    if not threads: return []
+
+    # 예산이 끝난 뒤에는 원본·닉네임 없이 스캔한 범위의 집계만 반환
+    sources, names = {}, {}
+    try:
+        source_records = _fetch_records(chat.api, sorted(threads))
+        user_cache = _prepare_records(chat, source_records)
+        for record in source_records:
+            source = _make_chat_from_record(chat, record, user_cache)
+            if source: sources[source.message.id] = source
+        user_ids = {uid for t in threads.values() for uid in t["users"]} - {0}
+        names = _display_names(chat.api, user_ids)
+    except DeadlineExceeded: pass
+
+    result = []
+    for thread_id in sorted(threads):
+        t = threads[thread_id]
+        source = sources.get(thread_id)
+        participants = dict(t["users"])
+        if source: participants = {source.sender.id: source.sender.name, **participants}
+        start_ts = int(source.raw.get("created_at") or t["first"]) if source else t["first"]
+        result.append({
+            "thread_id": thread_id,
+            "source": {
+                "id": source.message.id,
+                "sender": {"name": source.sender.name, "id": source.sender.id},
+                "content": source.message.msg,
+                "timestamp": source.raw.get("created_at"),
+            } if source else None,
+            "reply_count": t["count"],
+            "unique_participants": len(participants),
+            "participants": [{"name": name if name is not None else names.get(uid), "id": uid} for uid, name in participants.items()],
+            "last_reply_id": t["last_id"],
+            "last_reply_at": t["last"],
+            "duration_seconds": t["last"] - start_ts,
+        })
+    return result
+
+@_budgeted(list)
 def get_thread_timeline(chat: ChatContext, limit: int = 50) -> List[Dict[str, Any]]:
     """타임라인 리스트 생성"""
     source = get_thread_source(chat)
     if not source: return []
-    messages = [source] + get_thread_messages(chat, source.message.id, limit=limit)
+    messages = [source]
+    if limit > 0:
+        try:
+            for message in islice(iter_thread_messages(chat, source.message.id, page_size=limit), limit):
+                messages.append(message)
+        except DeadlineExceeded: pass
+        except Exception: _swallowed("get_thread_timeline")
+    return _timeline_from(messages)
+
+def _timeline_from(messages: List[ChatContext]) -> List[Dict[str, Any]]:
     return [{
         "name": m.sender.name, 
         "id": m.sender.id,
@@ -381,8 +2315,14 @@ def is_thread_starter(chat: ChatContext) -> bool:
     if not source: return False
     return str(source.sender.id) == str(chat.sender.id)
 
-def send_to_thread(chat: ChatContext, message: str, thread_id: Union[str, int] = None) -> bool:
-    """특정 스레드로 메시지 전송 (Persistent Session 사용)"""
+@_budgeted(False)
+def send_to_thread(chat: ChatContext, message: str, thread_id: Union[str, int] = None, wait: bool = True) -> Union[bool, Future]:
+    """특정 스레드로 메시지 전송 (Persistent Session 사용)
+
+    wait=False이면 전송 큐(ThreadSender)에 넣고 전송 결과(bool)를 담은 Future를 반환합니다.
+    큐가 가득 차면 빈자리를 기다리되 budget_ms가 있으면 그 안에서만 기다리며, 그래도 넣지 못했거나
+    전송 큐가 종료되었으면 예외(queue.Full / RuntimeError)를 담은 Future를 반환합니다.
+    """
     if not thread_id:
         tid = get_thread_id(chat)
         if tid: thread_id = tid
@@ -396,10 +2336,168 @@ def send_to_thread(chat: ChatContext, message: str, thread_id: Union[str, int] =
         "data": message, 
         "threadId": str(thread_id) if thread_id else None
     }
+    d = _DEADLINE.get()
+    if not wait:
+        try: return get_sender().submit(chat.api.iris_endpoint, payload, timeout=d.remaining() if d is not None else None, budget=d)
+        except (queue.Full, RuntimeError) as e:
+            _swallowed("send_to_thread.submit")
+            future = Future()
+            future.set_exception(e)
+            return future
+    if d is not None: d.check("reply")
     try:
-        res = _GLOBAL_SESSION.post(f"{chat.api.iris_endpoint}/reply", json=payload, timeout=5)
+        res = _timed("reply", _GLOBAL_SESSION.post, f"{chat.api.iris_endpoint}/reply", json=payload, timeout=_send_timeout(5, d))
         return res.ok
-    except: return False
+    except Exception: return _swallowed("send_to_thread", False)
+
+def _send_timeout(timeout: float, budget: Optional[Deadline]) -> float:
+    remaining = budget.remaining() if budget is not None else None
+    return timeout if remaining is None else min(timeout, remaining)
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+class ThreadSender:
+    """답장 전송 큐
+
+    - 방별 순서 보장: 한 방의 메시지는 한 번에 하나의 워커만 순서대로 전송합니다.
+    - 토큰 버킷(rate/burst)으로 전체 전송 속도를 제한합니다.
+    - 실패 시 지수 백오프로 max_retries번까지 재시도합니다.
+    - 대기 메시지가 max_queue개를 넘으면 submit이 블록되며, timeout이 지나면 queue.Full을 발생시킵니다.
+    - budget(Deadline)이 지난 메시지는 보내지 않고 재시도도 멈추며 결과는 False입니다.
+    """
+    def __init__(self, workers: int = 2, rate: float = 5.0, burst: int = 5, max_queue: int = 1000,
+                 max_retries: int = 3, backoff: float = 0.5, timeout: float = 5):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._bucket = _TokenBucket(rate, burst)
+        self._rooms = {}
+        self._ready = deque()
+        self._pending = 0
+        self._closed = False
+        self._threads = []
+        self._cond = threading.Condition()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def submit(self, endpoint: str, payload: Dict[str, Any], callback=None, block: bool = True, timeout: Optional[float] = None,
+               budget: Optional[Deadline] = None) -> Future:
+        """전송 작업 추가 (결과 bool을 담은 Future 반환)"""
+        future = Future()
+        if callback: future.add_done_callback(callback)
+        room = payload.get("room")
+        with self._cond:
+            if self._closed: raise RuntimeError("ThreadSender가 종료되었습니다")
+            if not self._cond.wait_for(lambda: self._pending < self.max_queue or self._closed, timeout=timeout if block else 0):
+                raise queue.Full("전송 큐가 가득 찼습니다")
+            if self._closed: raise RuntimeError("ThreadSender가 종료되었습니다")
+            jobs = self._rooms.get(room)
+            if jobs is None:
+                jobs = self._rooms[room] = deque()
+                self._ready.append(room)
+            jobs.append((endpoint, payload, future, budget))
+            self._pending += 1
+            self._start_workers()
+            self._cond.notify_all()
+        return future
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._run, name=f"ThreadSender-{len(self._threads)}", daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._ready or self._closed)
+                if not self._ready: return
+                room = self._ready.popleft()
+                endpoint, payload, future, budget = self._rooms[room][0]
+
+            ok = False
+            if future.set_running_or_notify_cancel():
+                ok = self._deliver(endpoint, payload, budget)
+
+            with self._cond:
+                jobs = self._rooms[room]
+                jobs.popleft()
+                if jobs: self._ready.append(room)
+                else: del self._rooms[room]
+                self._pending -= 1
+                if ok: self.sent += 1
+                else: self.failed += 1
+                self._cond.notify_all()
+            if future.running(): future.set_result(ok)
+
+    def _deliver(self, endpoint: str, payload: Dict[str, Any], budget: Optional[Deadline] = None) -> bool:
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retried += 1
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+            self._bucket.acquire()
+            if budget is not None and budget.remaining() == 0:
+                budget.exceeded("reply")
+                return False
+            try:
+                res = _timed("reply", _GLOBAL_SESSION.post, f"{endpoint}/reply", json=payload, timeout=_send_timeout(self.timeout, budget))
+                if res.ok: return True
+                if res.status_code < 500 and res.status_code != 429: return False
+            except Exception: _swallowed("ThreadSender.deliver")
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"queued": self._pending, "sent": self.sent, "failed": self.failed, "retried": self.retried}
+
+    def close(self, wait: bool = True, timeout: Optional[float] = None):
+        """대기 중인 메시지를 모두 보낸 뒤 워커 종료 (wait=False면 즉시 종료 신호만 보냄)"""
+        with self._cond:
+            if wait: self._cond.wait_for(lambda: self._pending == 0, timeout=timeout)
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads: t.join(timeout)
+
+_SENDER = None
+_SENDER_LOCK = threading.Lock()
+
+def get_sender() -> ThreadSender:
+    """send_to_thread(wait=False)가 사용하는 공유 전송 큐"""
+    global _SENDER
+    if _SENDER is None:
+        with _SENDER_LOCK:
+            if _SENDER is None: _SENDER = ThreadSender()
+    return _SENDER
+
+def configure_sender(**kwargs) -> ThreadSender:
+    """공유 전송 큐를 새 설정(ThreadSender 인자)으로 교체 (기존 큐는 남은 메시지를 보낸 뒤 종료)"""
+    global _SENDER
+    with _SENDER_LOCK:
+        old, _SENDER = _SENDER, ThreadSender(**kwargs)
+    if old is not None: threading.Thread(target=old.close, daemon=True).start()
+    return _SENDER
 
 class ThreadParticipant:
     """스레드 참여자 상세 객체"""
@@ -417,12 +2515,101 @@ class ThreadParticipant:
     def __repr__(self):
         return f"ThreadParticipant(name='{self.name}')"
 
+class ThreadSnapshot:
+    """한 시점의 스레드 상태 (원본 + 답장 + 발신자), 생성 후 변경 불가
+
+    fetch_count에는 스냅샷을 만드는 동안 발생한 query 호출 수가 기록됩니다.
+    added / new_users는 이전 스냅샷 대비 새로 추가된 답장과 참여자입니다 (처음 로드한 스냅샷은 전체).
+    예산 초과로 일부만 읽었으면 reason에 사유가 기록되며, refresh()로 나머지를 이어서 읽을 수 있습니다.
+    replies는 처음 로드할 때와 갱신한 뒤 모두 스레드 앞쪽 limit개이며, 그 뒤에 답장이 더 있으면 truncated가 True입니다.
+    잘린 답장도 added에는 들어가고 last_seen_id는 그 답장까지 진행합니다.
+    """
+    __slots__ = ('source', 'replies', 'users', 'fetch_count', 'loaded_at', 'added', 'new_users', 'reason', 'truncated', 'seen_id')
+
+    def __init__(self, source: Optional[ChatContext], replies: List[ChatContext], fetch_count: int = 0,
+                 added: Optional[List[ChatContext]] = None, previous_users=None, reason: Optional[str] = None,
+                 truncated: bool = False, seen_id: Optional[int] = None):
+        users = {}
+        for c in ([source] if source else []) + list(replies):
+            users.setdefault(c.sender.id, c.sender)
+        if previous_users:
+            for uid, user in previous_users.items(): users.setdefault(uid, user)
+        new_users = {uid: user for uid, user in users.items() if not previous_users or uid not in previous_users}
+        object.__setattr__(self, 'source', source)
+        object.__setattr__(self, 'replies', tuple(replies))
+        object.__setattr__(self, 'users', MappingProxyType(users))
+        object.__setattr__(self, 'fetch_count', fetch_count)
+        object.__setattr__(self, 'loaded_at', time.time())
+        object.__setattr__(self, 'added', tuple(replies) if added is None else tuple(added))
+        object.__setattr__(self, 'new_users', MappingProxyType(new_users))
+        object.__setattr__(self, 'reason', reason)
+        object.__setattr__(self, 'truncated', truncated)
+        object.__setattr__(self, 'seen_id', seen_id)
+
+    @property
+    def partial(self) -> bool:
+        return self.reason is not None
+
+    @property
+    def last_seen_id(self) -> Optional[int]:
+        """스냅샷에 반영된 마지막 답장 ID (답장이 없으면 원본 ID, 잘린 답장 포함)"""
+        if self.seen_id is not None: return self.seen_id
+        if self.replies: return self.replies[-1].message.id
+        return self.source.message.id if self.source else None
+
+    def merge(self, replies: List[ChatContext], fetch_count: int = 0, limit: Optional[int] = None, reason: Optional[str] = None) -> "ThreadSnapshot":
+        """새 답장을 병합한 스냅샷 (load_thread_snapshot과 같이 앞쪽 limit개만 유지, reason은 이번 조회의 예산 초과 사유)"""
+        last_seen = self.last_seen_id or 0
+        added = [r for r in replies if r.message.id > last_seen]
+        merged = list(self.replies) + added
+        truncated = self.truncated
+        if limit and len(merged) > limit:
+            merged, truncated = merged[:limit], True
+        seen_id = added[-1].message.id if added else self.last_seen_id
+        return ThreadSnapshot(self.source, merged, fetch_count, added, previous_users=self.users, reason=reason,
+                              truncated=truncated, seen_id=seen_id)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ThreadSnapshot은 변경할 수 없습니다")
+
+    def __repr__(self):
+        partial = ", partial" if self.reason else ""
+        truncated = ", truncated" if self.truncated else ""
+        return f"ThreadSnapshot(replies={len(self.replies)}, fetch_count={self.fetch_count}{partial}{truncated})"
+
+def load_thread_snapshot(chat: ChatContext, limit: int = 500, source: Optional[ChatContext] = None, budget_ms: Optional[float] = None) -> ThreadSnapshot:
+    """원본과 앞쪽 limit개 답장을 한 번에 읽어 ThreadSnapshot 생성 (답장이 더 있으면 truncated)"""
+    with _count_fetches() as counter, deadline(budget_ms) as d:
+        if source is None: source = get_thread_source(chat)
+        replies = get_thread_messages(chat, source.message.id, limit=limit + 1) if source else []
+    return ThreadSnapshot(source, replies[:limit], fetch_count=counter[0], reason=d.reason, truncated=len(replies) > limit)
+
+def load_thread_updates(chat: ChatContext, snapshot: ThreadSnapshot, limit: int = 500, budget_ms: Optional[float] = None) -> ThreadSnapshot:
+    """snapshot의 마지막 답장 이후(id > last_seen_id)만 조회하여 병합한 새 스냅샷"""
+    if snapshot.source is None: return snapshot.merge([], reason=snapshot.reason)
+    added = []
+    with _count_fetches() as counter, deadline(budget_ms) as d:
+        try:
+            for message in islice(iter_thread_messages(chat, snapshot.source.message.id, page_size=limit, after_id=snapshot.last_seen_id), limit):
+                added.append(message)
+        except DeadlineExceeded: pass
+        except Exception: added = _swallowed("load_thread_updates", [])
+    return snapshot.merge(added, fetch_count=counter[0], limit=limit, reason=d.reason)
+
 class Thread:
-    """카카오톡 스레드 통합 인터페이스"""
-    def __init__(self, chat: ChatContext):
+    """카카오톡 스레드 통합 인터페이스
+
+    budget_ms를 지정하면 모든 조회·복호화·전송이 호출마다 그 예산 안에서 수행되고,
+    예산을 넘기면 그때까지 읽은 결과가 부분 결과(is_partial)로 반환됩니다.
+    """
+    snapshot_limit = 500
+
+    def __init__(self, chat: ChatContext, budget_ms: Optional[float] = None):
         self._chat = chat
+        self.budget_ms = budget_ms
         self._cached_source = None
         self._cached_id = -1
+        self._snapshot = None
     
     @property
     def exists(self) -> bool:
@@ -440,11 +2627,38 @@ class Thread:
         """원본 메시지 ID (메서드)"""
         return self.id
 
+    @property
+    def snapshot(self) -> ThreadSnapshot:
+        """최초 접근 시 한 번만 로드되는 스레드 스냅샷"""
+        if self._snapshot is None:
+            self._snapshot = load_thread_snapshot(self._chat, limit=self.snapshot_limit, source=self._source_if_loaded(), budget_ms=self.budget_ms)
+        return self._snapshot
+
+    def refresh(self, full: bool = False) -> ThreadSnapshot:
+        """스냅샷 갱신: 마지막으로 본 답장 이후의 새 답장만 조회하여 병합 (full=True면 전체 재로드)
+
+        반환된 스냅샷의 added / new_users에 이번에 추가된 답장과 참여자가 들어 있습니다.
+        """
+        if full or self._snapshot is None or (self._snapshot.source is None and self._snapshot.partial):
+            self._snapshot = None
+            self._cached_source = None
+            return self.snapshot
+        self._snapshot = load_thread_updates(self._chat, self._snapshot, limit=self.snapshot_limit, budget_ms=self.budget_ms)
+        return self._snapshot
+
+    def updates(self) -> List[ChatContext]:
+        """마지막 확인 이후 새로 달린 답장 목록 (첫 호출은 현재까지의 전체 답장)"""
+        return list(self.refresh().added)
+
+    def _source_if_loaded(self) -> Optional[ChatContext]:
+        src = self._cached_source
+        return src if src is not None and src is not self._chat else None
+
     @property
     def source(self) -> ChatContext:
         """원본 메시지 (Fallback 포함)"""
         if not self._cached_source:
-            src = get_thread_source(self._chat)
+            src = self._snapshot.source if self._snapshot is not None else get_thread_source(self._chat, budget_ms=self.budget_ms)
             self._cached_source = src if src else self._chat
         return self._cached_source
 
@@ -476,54 +2690,82 @@ class Thread:
     @property
     def raw(self) -> Optional[Dict[str, Any]]:
         """스레드의 모든 정보를 구조화된 딕셔너리 형태로 반환 (Thread Raw)"""
-        return get_thread_as_dict(self._chat)
+        snap = self.snapshot
+        return _mark_partial(_thread_dict_from(self._chat, snap.source, snap.replies), snap.reason) if snap.source else None
 
     @property
     def participants(self) -> List[ThreadParticipant]:
         """참여자 객체 리스트"""
-        return [ThreadParticipant(**p) for p in get_participant_list(self._chat)]
+        snap = self.snapshot
+        return _mark_partial([ThreadParticipant(**p) for p in _participants_from(self._chat, snap.source, snap.replies)], snap.reason)
 
     @property
     def stats(self) -> Dict[str, Any]:
         """스레드 메타데이터 통계"""
         d = self.raw
-        return d.get("metadata", {}) if d else {}
+        return _mark_partial(d.get("metadata", {}), getattr(d, "reason", None)) if d else {}
 
     @property
     def summary(self) -> Dict[str, Any]:
         """스레드 상태 요약"""
-        return get_thread_summary(self._chat)
+        d = self.raw
+        return _mark_partial(_summary_from(d), getattr(d, "reason", None))
 
     @property
     def is_starter(self) -> bool:
         """현재 발신자가 시작자인지 확인"""
-        return is_thread_starter(self._chat)
+        source = self.snapshot.source
+        return bool(source) and str(source.sender.id) == str(self._chat.sender.id)
 
     def messages(self, limit: int = 50) -> List[ChatContext]:
         """스레드 내의 모든 답장 메시지 목록을 가져옵니다."""
         tid = self.id if self.id else self._chat.message.id
-        return get_thread_messages(self._chat, tid, limit=limit)
+        return get_thread_messages(self._chat, tid, limit=limit, budget_ms=self.budget_ms)
+
+    def iter_messages(self, page_size: int = 50, use_index: bool = True) -> Iterator[ChatContext]:
+        """스레드 답장을 페이지 단위로 순회합니다 (use_index는 iter_thread_messages 참고)."""
+        tid = self.id if self.id else self._chat.message.id
+        return iter_thread_messages(self._chat, tid, page_size=page_size, use_index=use_index)
+
+    def rows(self, limit: int = 50) -> List[ThreadRow]:
+        """답장을 지연 변환 ThreadRow 목록으로 가져옵니다 (본문·닉네임은 접근할 때 복호화)"""
+        if limit <= 0: return []
+        tid = self.id if self.id else self._chat.message.id
+        return list(islice(iter_thread_rows(self._chat, tid, page_size=limit), limit))
 
     def filter_by_user(self, user_id: Union[int, str]) -> List[ChatContext]:
         """특정 유저 메시지만 필터링"""
-        return filter_thread_by_user(self._chat, user_id)
+        return filter_thread_by_user(self._chat, user_id, budget_ms=self.budget_ms)
 
     def timeline(self, limit: int = 50) -> List[Dict[str, Any]]:
         """타임라인 데이터 생성"""
-        return get_thread_timeline(self._chat, limit=limit)
+        snap = self.snapshot
+        if not snap.source: return []
+        return _mark_partial(_timeline_from([snap.source] + list(snap.replies[:max(limit, 0)])), snap.reason)
 
     def get_context(self, limit: int = 5) -> List[ChatContext]:
         """최근 대화 흐름 조회"""
-        return get_thread_context(self._chat, limit=limit)
+        snap = self.snapshot
+        if not snap.source: return [self._chat]
+        return _mark_partial(_context_from(self._chat, snap.source, list(snap.replies[:20]), limit), snap.reason)
 
     def estimate_reply_target(self) -> ChatContext:
         """답장 대상 추정"""
-        return estimate_reply_target(self._chat)
+        return estimate_reply_target(self._chat, budget_ms=self.budget_ms)
+
+    def subscribe(self, callback, ttl: Optional[float] = -1) -> Subscription:
+        """이 스레드에 새 답장이 올 때마다 callback(chat) 호출 (track_thread_message 필요)"""
+        tid = self.id if self.id else self._chat.message.id
+        return subscribe_thread(tid, callback, ttl)
 
-    def send(self, message: str, target_id: Union[str, int] = None) -> bool:
-        """이 스레드 또는 특정 메시지에 답장 전송"""
+    def mention_candidates(self) -> List[Dict[str, Any]]:
+        """현재 메시지의 멘션에 해당하는 참여자 후보 목록"""
+        return resolve_mentions(self._chat, budget_ms=self.budget_ms)
+
+    def send(self, message: str, target_id: Union[str, int] = None, wait: bool = True) -> Union[bool, Future]:
+        """이 스레드 또는 특정 메시지에 답장 전송 (wait=False면 전송 큐에 넣고 Future 반환)"""
         tid = target_id if target_id else self.id
-        return send_to_thread(self._chat, message, thread_id=tid)
+        return send_to_thread(self._chat, message, thread_id=tid, wait=wait, budget_ms=self.budget_ms)
 
     def isOpenChannel(self) -> bool:
         return True
@@ -542,32 +2784,154 @@ def is_thread_reply(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         chat = args[0]
-        if is_reply_or_thread(chat):
+        with deadline() as d: matched = is_reply_or_thread(chat)
+        if matched:
             return func(*args, **kwargs)
+        # 예산이 끝나 판별하지 못했으면 안내 메시지 없이 건너뜀
+        if d.partial: return None
         chat.reply("메시지에 답장하여 요청하세요.")
         return None
     return wrapper
 
+@_budgeted(list)
 def get_thread_context(chat: ChatContext, limit: int = 5) -> List[ChatContext]:
     """전역 함수 형태의 대화 흐름 조회"""
     source = get_thread_source(chat)
     if not source: return [chat]
-    replies = get_thread_messages(chat, source.message.id, limit=20)
+    return _context_from(chat, source, get_thread_messages(chat, source.message.id, limit=20), limit)
+
+def _context_from(chat: ChatContext, source: ChatContext, replies: List[ChatContext], limit: int) -> List[ChatContext]:
     context = [source] + (replies[-limit:] if len(replies) > limit else replies)
     if not any(r.message.id == chat.message.id for r in context): context.append(chat)
     return context
 
+def _normalize_name(name: str) -> str:
+    """비교용 닉네임 (NFKC, 소문자, 공백·이모지·기호 제거)"""
+    return "".join(ch for ch in unicodedata.normalize("NFKC", name).casefold() if unicodedata.category(ch)[0] in "LN")
+
+class NicknameIndex:
+    """스레드 참여자 닉네임 인덱스 (정확 일치 / 정규화 일치 / 정규화 접두어 / 정규화 부분 일치)
+
+    resolve()는 멘션마다 해시 조회와 정렬된 키의 이진 탐색, 참여자 수만큼의 부분 문자열 검사만 수행하며,
+    후보는 (일치 점수, 최근 메시지 ID) 순으로 정렬됩니다.
+    """
+    EXACT, NORMALIZED, PREFIX, CONTAINS = 3, 2, 1, 0
+
+    def __init__(self):
+        self.covered = 0
+        self._users = {}
+        self._exact = {}
+        self._normalized = {}
+        self._keys = []
+        self._lock = threading.Lock()
+
+    def __contains__(self, user_id):
+        """닉네임까지 알고 있는 참여자인지 여부"""
+        entry = self._users.get(user_id)
+        return entry is not None and entry[0] is not None
+
+    def unnamed(self) -> Set[int]:
+        """닉네임을 아직 찾지 못한 참여자 ID"""
+        with self._lock:
+            return {uid for uid, entry in self._users.items() if entry[0] is None}
+
+    def add(self, user_id: int, name: Optional[str], message_id: int):
+        """참여자의 닉네임과 마지막 메시지 ID 반영"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                entry = self._users[user_id] = [None, message_id]
+            elif message_id > entry[1]:
+                entry[1] = message_id
+            if name and name != entry[0]:
+                if entry[0]: self._unlink(user_id, entry[0])
+                entry[0] = name
+                self._link(user_id, name)
+
+    def _link(self, user_id: int, name: str):
+        self._exact.setdefault(name, set()).add(user_id)
+        key = _normalize_name(name)
+        if not key: return
+        users = self._normalized.get(key)
+        if users is None:
+            users = self._normalized[key] = set()
+            bisect.insort(self._keys, key)
+        users.add(user_id)
+
+    def _unlink(self, user_id: int, name: str):
+        self._exact.get(name, set()).discard(user_id)
+        key = _normalize_name(name)
+        users = self._normalized.get(key)
+        if users is None: return
+        users.discard(user_id)
+        if not users:
+            del self._normalized[key]
+            self._keys.pop(bisect.bisect_left(self._keys, key))
+
+    def resolve(self, mentions: List[str]) -> List[Dict[str, Any]]:
+        """멘션 목록에 해당하는 참여자 후보 (점수·최근 순)"""
+        best = {}
+        with self._lock:
+            for mention in mentions:
+                matches = [(self.EXACT, uid) for uid in self._exact.get(mention, ())]
+                key = _normalize_name(mention)
+                if key:
+                    matches.extend((self.NORMALIZED, uid) for uid in self._normalized.get(key, ()))
+                    i = bisect.bisect_left(self._keys, key)
+                    while i < len(self._keys) and self._keys[i].startswith(key):
+                        matches.extend((self.PREFIX, uid) for uid in self._normalized[self._keys[i]])
+                        i += 1
+                    matches.extend((self.CONTAINS, uid) for k in self._keys if key in k for uid in self._normalized[k])
+                for score, uid in matches:
+                    if uid not in best or score > best[uid]["score"]:
+                        name, message_id = self._users[uid]
+                        best[uid] = {"user_id": uid, "name": name, "message_id": message_id, "score": score, "mention": mention}
+        return sorted(best.values(), key=lambda c: (c["score"], c["message_id"]), reverse=True)
+
+_NICKNAME_INDEXES = LRUCache(max_size=500, ttl=600)
+
+def _nickname_index(chat: ChatContext, source: ChatContext) -> NicknameIndex:
+    """스레드 참여자 집합과 함께 갱신되는 닉네임 인덱스 (새 답장의 처음 보는 발신자와 이름을 못 찾은 참여자만 이름 조회)"""
+    key = (int(chat.room.id), int(source.message.id))
+    index = _NICKNAME_INDEXES.get(key)
+    if index is None:
+        index = NicknameIndex()
+        index.add(source.sender.id, source.sender.name, source.message.id)
+        _NICKNAME_INDEXES.set(key, index)
+    reply_ids, sender_ids = _THREAD_INDEX.replies(chat, source.message.id)
+    start = bisect.bisect_right(reply_ids, index.covered)
+    new_ids, new_senders = reply_ids[start:], sender_ids[start:]
+    unknown = {uid for uid in new_senders if uid not in index} | index.unnamed()
+    names = _display_names(chat.api, unknown) if unknown else {}
+    for message_id, user_id in zip(new_ids, new_senders):
+        index.add(user_id, names.get(user_id), message_id)
+    # 이전에 이름을 못 찾았던 참여자는 이번에 찾은 이름만 반영 (메시지 ID는 그대로)
+    for user_id, name in names.items():
+        if name: index.add(user_id, name, 0)
+    if new_ids: index.covered = max(index.covered, new_ids[-1])
+    return index
+
+@_budgeted(list)
+def resolve_mentions(chat: ChatContext, mentions: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """메시지의 @멘션(또는 주어진 이름)에 해당하는 스레드 참여자 후보 목록 (점수·최근 순)"""
+    source = get_thread_source(chat)
+    if not source: return []
+    if mentions is None: mentions = MENTION_PATTERN.findall(chat.message.msg or "")
+    if not mentions: return []
+    try: return _nickname_index(chat, source).resolve(mentions)
+    except Exception: return _swallowed("resolve_mentions", [])
+
+@_budgeted()
 def estimate_reply_target(chat: ChatContext) -> ChatContext:
-    """전역 함수 형태의 답장 대상 추정"""
+    """전역 함수 형태의 답장 대상 추정 (멘션된 참여자의 마지막 메시지, 없으면 원본)"""
     source = get_thread_source(chat)
     if not source: return chat
-    names = MENTION_PATTERN.findall(chat.message.msg or "")
-    if not names: return source
-    for reply in reversed(get_thread_messages(chat, source.message.id, limit=30)):
-        for name in names:
-            if name in reply.sender.name: return reply
-    for name in names:
-        if name in source.sender.name: return source
+    try:
+        for candidate in resolve_mentions(chat):
+            if candidate["message_id"] == source.message.id: return source
+            replies = _build_replies(chat, [candidate["message_id"]], {candidate["user_id"]})
+            if replies: return replies[0]
+    except DeadlineExceeded: pass
     return source
 
 def _get_thread_lazy(self):